@@ -7,58 +7,49 @@ Qconverto - 使用 NiceGUI 重构的多媒体文件格式转换工具
 优化版本 - 具有更好的UI/UX和性能
 """
 
+import io
 import os
+import re
 import sys
+import mmap
+import time
+import shutil
+import signal
+import socket
+import struct
 import asyncio
 import logging
+import zipfile
+import platform
+import functools
+import tempfile
+import threading
+import traceback
+import subprocess
+import queue
+import importlib.util
+import multiprocessing
+import multiprocessing.util
+from xml.sax.saxutils import escape
 from pathlib import Path
-from datetime import datetime
-from nicegui import ui, app, events
-from typing import Optional, Dict, Any
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from nicegui import app, ui, events
+from typing import Optional, Tuple
 
-# 添加当前目录到路径
-sys.path.insert(0, '.')
+# 程序所在目录（只计算一次，后续直接复用）
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 添加程序目录到路径
+sys.path.insert(0, BASE_DIR)
 
 # 导入UI组件
 from ui_components import ModernUIComponents
 
-# 添加自定义CSS样式
-ui.add_head_html('''
-<style>
-    @keyframes pulse {
-        0% { transform: scale(1); }
-        50% { transform: scale(1.1); }
-        100% { transform: scale(1); }
-    }
-    
-    @keyframes bounce {
-        0%, 100% { transform: translateY(0); }
-        50% { transform: translateY(-10px); }
-    }
-    
-    @keyframes spin {
-        0% { transform: rotate(0deg); }
-        100% { transform: rotate(360deg); }
-    }
-    
-    .animate-pulse {
-        animation: pulse 2s infinite;
-    }
-    
-    .animate-bounce {
-        animation: bounce 1s infinite;
-    }
-    
-    .animate-spin {
-        animation: spin 1s linear infinite;
-    }
-    
-    .file-area-hover {
-        background-color: #f0f9ff;
-        border-color: #3b82f6;
-    }
-</style>
-''')
+# 添加自定义CSS样式（以静态文件提供，浏览器可缓存）
+app.add_static_files('/static', os.path.join(BASE_DIR, 'static'))
+ui.add_head_html('<link rel="stylesheet" href="/static/qconverto.css">')
 
 # 配置日志
 logging.basicConfig(
@@ -71,13 +62,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# 检查MoviePy是否可用
-try:
-    from moviepy.editor import VideoFileClip
-    MOVIEPY_AVAILABLE = True
-except ImportError:
-    MOVIEPY_AVAILABLE = False
-
 # 支持的文件格式字典
 SUPPORTED_FORMATS = {
     '图片': {
@@ -99,7 +83,7 @@ SUPPORTED_FORMATS = {
 }
 
 # 文件类型到图标的映射
-FILE_TYPE_ICONS = {
+FILE_TYPE_ICONS = MappingProxyType({
     # 图片格式
     '.jpg': 'image',
     '.jpeg': 'image',
@@ -203,14 +187,677 @@ FILE_TYPE_ICONS = {
     '.app': 'apple',
     '.crx': 'extension',
     '.xpi': 'extension',
-    '.ico': 'extension',
-    '.svg': 'extension',
     '.ttf': 'font_download',
     '.otf': 'font_download',
     '.woff': 'font_download',
     '.woff2': 'font_download'
+})
+
+# 扩展名 → 文件类型 的扁平索引，查找时一次字典访问即可
+# 同一扩展名出现在多个类型中时（如 .mp4），以 SUPPORTED_FORMATS 中靠前的类型为准
+EXT_TO_CATEGORY = {}
+for _category, _formats in SUPPORTED_FORMATS.items():
+    for _ext in _formats['输入']:
+        EXT_TO_CATEGORY.setdefault(_ext, _category)
+EXT_TO_CATEGORY = MappingProxyType(EXT_TO_CATEGORY)
+# 最常见且无需读取文件头的扩展名 → 文件类型：这类文件即使被改错扩展名，实际内容也几乎总是同类格式（如PNG/JPEG互换），
+# 识别结果不会改变；PDF、DOCX，以及RIFF（.wav/.avi/.webp）、ftyp（.m4a）、ZIP 等容器格式仍按文件内容识别
+UNAMBIGUOUS_EXTS = MappingProxyType({
+    '.jpg': '图片',
+    '.jpeg': '图片',
+    '.png': '图片',
+    '.mp3': '音频'
+})
+# 上传组件的 accept 属性：文件选择对话框只列出支持的输入格式
+UPLOAD_ACCEPT = ','.join(EXT_TO_CATEGORY)
+# 文件类型 → 可选输出格式的展示文本（如 '.pdf, .docx, .txt'），每次识别文件时直接取用
+OUTPUTS_JOINED = MappingProxyType({
+    _category: ', '.join(_formats['输出']) for _category, _formats in SUPPORTED_FORMATS.items()
+})
+# 文件类型 → 可接受的输入扩展名集合，判断扩展名是否属于某类型时为O(1)查找
+CATEGORY_INPUT_EXTS = MappingProxyType({
+    _category: frozenset(_formats['输入']) for _category, _formats in SUPPORTED_FORMATS.items()
+})
+del _category, _formats, _ext
+
+# 文件头签名 → 文件类型，用于识别扩展名与实际内容不符的文件
+# 按实际上传频率排序（JPEG、PNG、PDF、MP3最常见），常见文件在前几次比较内即可命中
+FILE_SIGNATURES = (
+    (b'\xff\xd8\xff', '图片'),  # JPEG
+    (b'\x89PNG\r\n\x1a\n', '图片'),
+    (b'%PDF-', '文档'),
+    (b'ID3', '音频'),  # 带ID3标签的MP3
+    (b'\xff\xfb', '音频'),  # MP3帧头
+    (b'GIF87a', '图片'),
+    (b'GIF89a', '图片'),
+    (b'\x00\x00\x01\x00', '图片'),  # ICO
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', '文档'),  # DOC（OLE2复合文档）
+    (b'\xff\xf3', '音频'),
+    (b'\xff\xf2', '音频'),
+    (b'\xff\xf1', '音频'),  # AAC（ADTS）
+    (b'\xff\xf9', '音频'),
+    (b'fLaC', '音频'),
+    (b'OggS', '音频'),
+    (b'MAC ', '音频'),  # APE
+    (b'wvpk', '音频'),  # WavPack
+    (b'\x1a\x45\xdf\xa3', '视频'),  # MKV/WebM（EBML）
+    (b'\x30\x26\xb2\x75\x8e\x66\xcf\x11', '视频'),  # WMV（ASF）
+    (b'FLV\x01', '视频')
+)
+
+# RIFF容器第8~12字节的格式标识 → 文件类型
+RIFF_FORMS = {
+    b'WAVE': '音频',
+    b'AVI ': '视频',
+    b'WEBP': '图片'
 }
 
+# ISO媒体文件（MP4/MOV/M4A）ftyp中可明确区分音视频的品牌；其他品牌音视频通用，交由扩展名判断
+FTYP_BRANDS = {
+    b'M4A ': '音频',
+    b'M4B ': '音频',
+    b'qt  ': '视频'
+}
+
+# 所有签名合并为一个锚定在文件头的正则，一次匹配即可完成识别；第N个分组对应第N条签名
+FILE_SIGNATURE_RE = re.compile(b'|'.join(b'(' + re.escape(signature) + b')' for signature, _ in FILE_SIGNATURES))
+
+# 最长签名的长度；识别文件类型时只需读取这么多字节（至少12字节，覆盖RIFF/ftyp第8~12字节的格式标识）
+MAX_SIG_LEN = max(len(signature) for signature, _ in FILE_SIGNATURES)
+SNIFF_BYTES = max(MAX_SIG_LEN, 12)
+
+# ZIP本地文件头签名（DOCX等Office Open XML文档都是ZIP包）
+ZIP_SIGNATURE = b'PK\x03\x04'
+
+# 只由可打印ASCII字符组成的签名（如 'MAC '、'ID3'、'OggS'、'%PDF-'）也可能恰好是文本的开头，只算弱证据，
+# 不能推翻扩展名给出的类型；含二进制字节的签名以及RIFF、ftyp、DOCX等结构校验才足以改判
+_PRINTABLE_BYTES = frozenset(range(0x20, 0x7f))
+STRONG_SIGNATURES = tuple(not set(signature) <= _PRINTABLE_BYTES for signature, _ in FILE_SIGNATURES)
+del _PRINTABLE_BYTES
+
+
+# 输出格式选项（与 SUPPORTED_FORMATS 中的写法一致，如 '.pdf'）→ 图标名，选择格式时直接查表
+FORMAT_TO_ICON = MappingProxyType({
+    fmt: FILE_TYPE_ICONS.get(fmt, 'insert_drive_file')
+    for formats in SUPPORTED_FORMATS.values() for fmt in formats['输出']
+})
+
+@functools.lru_cache(maxsize=None)
+def _module_available(name: str) -> bool:
+    """只查找模块是否已安装而不执行导入；失败的导入不会被缓存，可选依赖缺失时每次import都要重新搜索一遍路径"""
+    return importlib.util.find_spec(name) is not None
+
+
+# 重量级依赖在首次使用时才导入，避免拖慢应用启动
+@functools.lru_cache(maxsize=None)
+def _get_moviepy():
+    """导入MoviePy（会连带导入numpy、imageio等），不可用时返回None"""
+    try:
+        import moviepy.editor as moviepy_editor
+    except ImportError:
+        return None
+    return moviepy_editor
+
+
+@functools.lru_cache(maxsize=None)
+def _get_fitz():
+    """导入PyMuPDF"""
+    import fitz
+    return fitz
+
+
+@functools.lru_cache(maxsize=None)
+def _get_ffmpeg():
+    """导入ffmpeg-python"""
+    import ffmpeg
+    return ffmpeg
+
+
+@functools.lru_cache(maxsize=None)
+def _get_pil_image():
+    """导入Pillow的Image模块"""
+    import PIL
+    from PIL import Image
+    # Pillow-SIMD 的版本号带有 .postN 后缀，据此确认SIMD加速是否生效
+    if 'post' in PIL.__version__:
+        logger.info(f"使用 Pillow-SIMD {PIL.__version__}")
+    else:
+        logger.info(f"使用 Pillow {PIL.__version__}（未启用SIMD加速）")
+    return Image
+
+
+# 各音频输出格式对应的FFmpeg编码参数
+AUDIO_CODEC_ARGS = {
+    '.mp3': {'acodec': 'libmp3lame', 'audio_bitrate': '192k'},
+    '.wav': {'acodec': 'pcm_s16le'},
+    '.flac': {'acodec': 'flac'},
+    '.ogg': {'acodec': 'libvorbis'},
+    '.m4a': {'acodec': 'aac', 'audio_bitrate': '192k'}
+}
+
+# 各音频输出格式可直接复制（-c:a copy，无需解码再编码）的源音频编码
+AUDIO_COPY_CODECS = {
+    '.mp3': {'mp3'},
+    '.wav': {'pcm_s16le'},
+    '.flac': {'flac'},
+    '.ogg': {'vorbis', 'opus'},
+    '.m4a': {'aac', 'alac'}
+}
+
+
+# 各视频容器可直接封装（无需重新编码）的视频/音频编码，None表示不限制
+STREAM_COPY_CODECS = {
+    '.mp4': ({'h264', 'hevc', 'mpeg4', 'av1'}, {'aac', 'mp3', 'ac3', 'alac'}),
+    '.mov': ({'h264', 'hevc', 'mpeg4', 'prores', 'mjpeg'}, {'aac', 'mp3', 'alac', 'pcm_s16le'}),
+    '.mkv': (None, None),  # MKV几乎可以容纳任何编码
+    '.avi': ({'mpeg4', 'msmpeg4v3', 'mjpeg', 'h264'}, {'mp3', 'ac3', 'pcm_s16le'}),
+    '.wmv': ({'wmv1', 'wmv2', 'wmv3', 'vc1'}, {'wmav1', 'wmav2'})
+}
+
+
+# H.264硬件编码器及其质量参数，按优先级排列（NVIDIA、Intel、Apple）
+HW_H264_ENCODERS = {
+    'h264_nvenc': {'preset': 'p4', 'cq': 23},
+    'h264_qsv': {'global_quality': 23},
+    'h264_videotoolbox': {'b:v': '6M'}
+}
+
+# 可使用硬件编码器输出的视频容器
+HW_ENCODE_CONTAINERS = ('.mp4', '.mkv', '.mov')
+
+# 图片输出格式 → PIL保存参数：显式指定格式省去按扩展名查找编码器，并关闭耗时的优化选项
+_JPEG_SAVE_ARGS = {'format': 'JPEG', 'quality': 90, 'optimize': False, 'progressive': False, 'subsampling': 2}
+IMAGE_SAVE_ARGS = MappingProxyType({
+    '.jpg': _JPEG_SAVE_ARGS,
+    '.jpeg': _JPEG_SAVE_ARGS,
+    '.png': {'format': 'PNG', 'compress_level': 1},
+    '.webp': {'format': 'WEBP', 'quality': 90, 'method': 0},
+    '.pdf': {'format': 'PDF'}
+})
+
+# 不支持透明通道的图片输出格式，保存前需转换为RGB
+RGB_ONLY_IMAGE_FORMATS = frozenset({'JPEG', 'PDF'})
+
+
+def _find_ffmpeg() -> Optional[str]:
+    """查找可用的FFmpeg可执行文件路径，找不到时返回None"""
+    ffmpeg_path = shutil.which("ffmpeg")
+    if not ffmpeg_path:
+        # 尝试使用相对路径或打包环境中的ffmpeg
+        possible_paths = [
+            "ffmpeg",
+            "./ffmpeg",
+            "./ffmpeg.exe",
+            os.path.join(BASE_DIR, "ffmpeg"),
+            os.path.join(BASE_DIR, "ffmpeg.exe")
+        ]
+        
+        for path in possible_paths:
+            if os.path.exists(path) or shutil.which(path):
+                ffmpeg_path = path
+                break
+    return ffmpeg_path
+
+
+def _find_libreoffice() -> Optional[str]:
+    """查找可用的LibreOffice可执行文件路径，找不到时返回None"""
+    # soffice 是 libreoffice 的命令行工具
+    return shutil.which("libreoffice") or shutil.which("soffice")
+
+
+def _write_pcm16_wav(output_file: str, nchannels: int, sample_rate: int, samples):
+    """将16位PCM采样直接写成WAV文件：44字节文件头后通过memoryview写出采样数据，不产生中间副本"""
+    data = memoryview(samples).cast('B')
+    block_align = nchannels * 2
+    header = struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 36 + data.nbytes, b'WAVE',
+        b'fmt ', 16, 1, nchannels, sample_rate, sample_rate * block_align, block_align, 16,
+        b'data', data.nbytes
+    )
+    with open(output_file, 'wb') as f:
+        f.write(header)
+        f.write(data)
+
+
+async def _async_copyfile(src: str, dst: str):
+    """在线程中复制文件，避免大文件复制阻塞事件循环"""
+    # shutil.copy2 在 Linux 上使用 sendfile 内核零拷贝，在 Windows 上使用系统复制接口
+    await asyncio.to_thread(shutil.copy2, src, dst)
+
+
+def _link_or_copy(src: str, dst: str):
+    """输出与输入格式相同时直接得到输出文件：优先创建硬链接（O(1)），跨文件系统等情况下退回到复制"""
+    # 未指定输出目录时输出路径与输入相同，文件本身就是结果
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    try:
+        if os.path.lexists(dst):
+            os.remove(dst)
+        os.link(src, dst)
+    except OSError:
+        # shutil.copy2 在 Linux 上使用 sendfile 内核零拷贝
+        shutil.copy2(src, dst)
+
+
+@functools.lru_cache(maxsize=2)
+def _load_audio_segment(path: str, mtime_ns: int, size: int):
+    """用pydub解码音频；以修改时间和大小作为缓存键，常驻工作进程中同一输入转换为多种格式时只解码一次
+    
+    解码结果是完整的PCM数据，占用内存较大，每个工作进程只保留最近两个
+    """
+    from pydub import AudioSegment
+    
+    return AudioSegment.from_file(path)
+
+
+@functools.lru_cache(maxsize=1)
+def _probe_hw_encoders() -> tuple:
+    """查询FFmpeg编译进的硬件编码器（只执行一次 ffmpeg -encoders），按优先级返回"""
+    if not FFMPEG_PATH:
+        return ()
+    try:
+        result = subprocess.run([FFMPEG_PATH, "-hide_banner", "-encoders"],
+                                capture_output=True, text=True, timeout=10)
+    except Exception as e:
+        logger.warning(f"探测FFmpeg硬件编码器失败: {e}")
+        return ()
+    available = {line.split()[1] for line in result.stdout.splitlines() if len(line.split()) > 1}
+    return tuple(name for name in HW_H264_ENCODERS if name in available)
+
+
+def _probe(path: str) -> Optional[os.stat_result]:
+    """获取文件状态，文件不存在或无法访问时返回None（一次stat同时得到存在性和大小）"""
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+def _detect_type_from_header(head: bytes) -> Optional[Tuple[str, bool]]:
+    """根据文件头内容判断文件类型，返回 (文件类型, 是否为强签名)，无法识别时返回None"""
+    match = FILE_SIGNATURE_RE.match(head)
+    if match:
+        index = match.lastindex - 1
+        return FILE_SIGNATURES[index][1], STRONG_SIGNATURES[index]
+    if head[:4] == b'RIFF':
+        file_type = RIFF_FORMS.get(head[8:12])
+    elif head[4:8] == b'ftyp':
+        file_type = FTYP_BRANDS.get(head[8:12])
+    else:
+        return None
+    return (file_type, True) if file_type else None
+
+
+def _is_docx_package(path: str) -> bool:
+    """ZIP包中含有 word/document.xml 时视为DOCX（只读取ZIP中央目录，不解压任何内容）"""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            # 中央目录已被解析为 文件名→条目 的字典，一次查找即可，无需逐个比较成员名
+            zf.getinfo('word/document.xml')
+            return True
+    except (KeyError, zipfile.BadZipFile, OSError):
+        return False
+
+
+@functools.lru_cache(maxsize=256)
+def _sniff_file_type(path: str, mtime_ns: int, size: int) -> Optional[Tuple[str, bool]]:
+    """读取文件头识别文件类型，返回 (文件类型, 是否为强签名)；以修改时间和大小作为缓存键，文件未变化时不再重复读取"""
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    detected = _detect_type_from_header(head)
+    # ZIP包需要查看其中的目录结构才能判断是否为DOCX
+    if detected is None and head.startswith(ZIP_SIGNATURE) and _is_docx_package(path):
+        return '文档', True
+    return detected
+
+
+# 外部工具路径在进程生命周期内不会变化，启动时解析一次即可
+FFMPEG_PATH = _find_ffmpeg()
+LIBREOFFICE_PATH = _find_libreoffice()
+
+
+# 常驻LibreOffice服务的UNO连接参数：复用同一个soffice进程，避免每次转换都冷启动整个办公套件
+SOFFICE_HOST = "127.0.0.1"
+SOFFICE_PORT = 2002
+SOFFICE_UNO_CONNECTION = f"socket,host={SOFFICE_HOST},port={SOFFICE_PORT};urp"
+SOFFICE_CONNECT_TIMEOUT = 30.0
+
+_soffice_process = None  # 本进程启动的soffice服务
+# 跨进程共享的soffice状态：值为最近启动的服务的进程号（0表示尚未启动）；
+# 附带的锁在界面进程和所有转换工作进程之间共享，同一时间只让一个进程启动服务或通过UNO转换文档
+_soffice_state = None
+
+
+def _get_soffice_state():
+    """获取跨进程共享的soffice状态（界面进程中首次使用时创建，工作进程由 _init_conversion_process 传入）"""
+    global _soffice_state
+    if _soffice_state is None:
+        _soffice_state = multiprocessing.Value('i', 0)
+    return _soffice_state
+
+
+def _uno_connect_desktop():
+    """连接常驻的soffice服务并返回Desktop对象，服务刚启动时会重试直到超时"""
+    import uno
+    
+    local_ctx = uno.getComponentContext()
+    resolver = local_ctx.ServiceManager.createInstanceWithContext(
+        "com.sun.star.bridge.UnoUrlResolver", local_ctx)
+    deadline = time.monotonic() + SOFFICE_CONNECT_TIMEOUT
+    while True:
+        try:
+            ctx = resolver.resolve(f"uno:{SOFFICE_UNO_CONNECTION};StarOffice.ComponentContext")
+            return ctx.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", ctx)
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.25)
+
+
+def _uno_convert_to_pdf(input_file: str, output_file: str):
+    """通过UNO让常驻的soffice加载文档并导出为PDF（阻塞调用）"""
+    import uno
+    from com.sun.star.beans import PropertyValue
+    
+    def make_property(name, value):
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        return prop
+    
+    desktop = _uno_connect_desktop()
+    doc = desktop.loadComponentFromURL(
+        uno.systemPathToFileUrl(os.path.abspath(input_file)), "_blank", 0,
+        (make_property("Hidden", True),))
+    if doc is None:
+        raise RuntimeError("LibreOffice 无法打开该文档")
+    try:
+        doc.storeToURL(
+            uno.systemPathToFileUrl(os.path.abspath(output_file)),
+            (make_property("FilterName", "writer_pdf_Export"),))
+    finally:
+        doc.close(True)
+
+
+def _soffice_server_available() -> bool:
+    """是否具备使用常驻soffice服务的条件（已安装LibreOffice且可导入uno模块）"""
+    return bool(LIBREOFFICE_PATH) and _module_available("uno")
+
+
+def _soffice_listening() -> bool:
+    """soffice服务端口上是否已有服务在监听（服务可能由界面进程或其他工作进程启动）"""
+    try:
+        with socket.create_connection((SOFFICE_HOST, SOFFICE_PORT), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def _start_soffice_server():
+    """启动常驻的soffice服务并等待其开始监听（调用方需持有 _get_soffice_state() 的锁）；端口上已有服务时不做任何事
+    
+    服务可能由界面进程或任一工作进程启动，fork出的工作进程也无法通过继承来的 Popen 对象判断服务是否存活，
+    因此以端口是否可连接为准；启动后在锁内等到端口可连接，其他进程不会把尚在启动的服务误判为不存在而重复启动
+    """
+    global _soffice_process
+    
+    if _soffice_listening():
+        return
+    # 本进程之前启动的服务仍在运行却不再监听，说明已失去响应，先将其结束
+    _terminate_own_soffice()
+    _soffice_process = subprocess.Popen(
+        [LIBREOFFICE_PATH, "--headless", "--invisible", "--nologo", "--norestore",
+         f"--accept={SOFFICE_UNO_CONNECTION};StarOffice.ServiceManager"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    _get_soffice_state().value = _soffice_process.pid
+    deadline = time.monotonic() + SOFFICE_CONNECT_TIMEOUT
+    while not _soffice_listening():
+        if _soffice_process.poll() is not None:
+            raise RuntimeError("LibreOffice 服务启动失败")
+        if time.monotonic() > deadline:
+            raise RuntimeError("LibreOffice 服务启动超时")
+        time.sleep(0.25)
+
+
+def _prewarm_soffice_server():
+    """提前启动常驻的soffice服务（在后台线程中执行，不阻塞界面启动）"""
+    try:
+        with _get_soffice_state().get_lock():
+            _start_soffice_server()
+    except Exception as e:
+        logger.warning(f"预启动 LibreOffice 服务失败: {e}")
+
+
+def _soffice_convert_locked(input_file: str, output_file: str):
+    """持有跨进程锁确认服务可用并转换文档（阻塞调用）"""
+    with _get_soffice_state().get_lock():
+        _start_soffice_server()
+        _uno_convert_to_pdf(input_file, output_file)
+
+
+async def _soffice_convert_to_pdf(input_file: str, output_file: str) -> bool:
+    """使用常驻soffice服务转换文档，服务不可用（无LibreOffice或无uno模块）时返回False"""
+    if not _soffice_server_available():
+        return False
+    
+    # 锁在所有转换工作进程之间共享，单个转换与批量转换同时进行时soffice也只会同时处理一个文档
+    await asyncio.to_thread(_soffice_convert_locked, input_file, output_file)
+    return True
+
+
+def _terminate_own_soffice():
+    """结束本进程启动的soffice进程"""
+    global _soffice_process
+    
+    if _soffice_process is not None and _soffice_process.poll() is None:
+        _soffice_process.terminate()
+        try:
+            _soffice_process.wait(timeout=5)
+        except Exception:
+            _soffice_process.kill()
+    _soffice_process = None
+
+
+def _shutdown_soffice_server():
+    """结束常驻的soffice进程：本进程启动的直接结束，由工作进程启动的按共享状态中记录的进程号结束"""
+    own_pid = _soffice_process.pid if _soffice_process is not None else None
+    _terminate_own_soffice()
+    if _soffice_state is None:
+        return
+    pid = _soffice_state.value
+    if pid and pid != own_pid:
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            # 服务已经退出
+            pass
+
+
+# 文本转PDF时可用的中文字体候选路径（reportlab仅支持TrueType轮廓的字体）
+CJK_FONT_CANDIDATES = [
+    "C:/Windows/Fonts/simsun.ttc",  # Windows 宋体
+    "C:/Windows/Fonts/msyh.ttc",  # Windows 微软雅黑
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",  # Linux 文泉驿微米黑
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",  # Linux 文泉驿正黑
+    "/usr/share/fonts/truetype/droid/DroidSansFallbackFull.ttf",  # Linux Droid
+    "/System/Library/Fonts/STHeiti Light.ttc",  # macOS 华文黑体
+    "/Library/Fonts/Arial Unicode.ttf"  # macOS
+]
+
+
+@functools.lru_cache(maxsize=1)
+def _register_cjk_font() -> str:
+    """注册中文字体并返回字体名称，字体文件在每个进程中只解析一次"""
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    
+    for font_path in CJK_FONT_CANDIDATES:
+        if not os.path.exists(font_path):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont('CJKFont', font_path))
+            return 'CJKFont'
+        except Exception as e:
+            logger.warning(f"注册字体失败 {font_path}: {e}")
+    
+    # 没有可用的中文字体时使用默认字体
+    return 'Helvetica'
+
+
+def _decode_text(raw: bytes) -> str:
+    """识别文本的编码并解码"""
+    # 最常见的UTF-8（含带BOM的文件）直接解码成功时无需运行编码识别
+    try:
+        return raw.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        pass
+    
+    try:
+        from charset_normalizer import from_bytes
+        
+        best = from_bytes(raw).best()
+        if best is not None and best.encoding:
+            return raw.decode(best.encoding, errors='replace')
+    except ImportError:
+        pass
+    
+    # 未安装charset-normalizer或识别失败时，依次尝试常用编码
+    for encoding in ('gbk', 'gb2312'):
+        try:
+            return raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return raw.decode('latin-1')
+
+
+# 转换进度至少增长这么多（百分点）才向界面汇报
+PROGRESS_MIN_STEP = 2
+
+# 界面刷新进度的最短间隔（秒），约每秒10次
+PROGRESS_UI_INTERVAL = 0.1
+
+# 界面进程等待工作进程进度消息、工作进程检查取消请求的间隔（秒）
+JOB_POLL_INTERVAL = 0.1
+
+# PDF转文本时每批提取的页数
+PDF_TEXT_BATCH_PAGES = 16
+
+# Markdown标题行：1~6个 # 后跟空白；"#hashtag"、"#1 项" 等普通文本不视为标题
+MARKDOWN_HEADING_RE = re.compile(r'(#{1,6})\s+(.*)')
+
+# PDF转DOCX时每批处理的页数（每批结束后释放MuPDF缓存并汇报进度）
+PDF_DOCX_BATCH_PAGES = 20
+
+# XML 1.0 不允许出现的控制字符（PDF提取的文本中偶尔会带有）
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _DocxWriter:
+    """极简DOCX写入器：直接拼接 word/document.xml，样式等其余部件取自python-docx自带的模板
+    
+    接口与 python-docx 的 Document 一致（add_heading / add_paragraph / save），
+    但不为每个段落创建lxml元素，适合页数很多的PDF转DOCX
+    """
+    
+    def __init__(self):
+        self._body = io.StringIO()
+    
+    def add_heading(self, text: str, level: int = 1):
+        style = 'Title' if level == 0 else f'Heading{level}'
+        self._body.write(f'<w:p><w:pPr><w:pStyle w:val="{style}"/></w:pPr>{self._run(text)}</w:p>')
+    
+    def add_paragraph(self, text: str = ''):
+        self._body.write(f'<w:p>{self._run(text)}</w:p>')
+    
+    @staticmethod
+    def _run(text: str) -> str:
+        """生成文本对应的 w:r 元素，换行符转换为 w:br"""
+        lines = (escape(XML_INVALID_CHARS.sub('', line)) for line in text.split('\n'))
+        return '<w:r>' + '<w:br/>'.join(f'<w:t xml:space="preserve">{line}</w:t>' for line in lines) + '</w:r>'
+    
+    def save(self, output_file: str):
+        import docx
+        
+        template = os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx')
+        with zipfile.ZipFile(template) as src, \
+                zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for item in src.infolist():
+                data = src.read(item.filename)
+                if item.filename == 'word/document.xml':
+                    # 模板正文只有节属性（页面大小、边距），把生成的段落插到它前面
+                    document = data.decode('utf-8')
+                    pos = document.rindex('<w:sectPr')
+                    data = (document[:pos] + self._body.getvalue() + document[pos:]).encode('utf-8')
+                dst.writestr(item, data)
+
+
+# PDF渲染进程池（首次使用时创建）
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+# PDF渲染进程池的大小；批量转换的多个工作进程各自创建进程池，由 _init_conversion_process 按工作进程数分摊CPU
+_pdf_pool_workers = os.cpu_count() or 1
+
+
+def _get_pdf_pool() -> ProcessPoolExecutor:
+    """获取用于PDF页面渲染的进程池"""
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = ProcessPoolExecutor(max_workers=_pdf_pool_workers)
+    return _pdf_pool
+
+
+def _extract_pdf_text(pdf_path: str, start: int, end: int) -> str:
+    """提取PDF指定范围页面的文本（在工作进程或线程中执行），每页之间以空行分隔"""
+    fitz = _get_fitz()  # PyMuPDF
+    
+    # 显式指定flags（不含 TEXT_PRESERVE_IMAGES），sort=False 保留内容流原始顺序，省去按坐标排序
+    text_flags = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_PRESERVE_LIGATURES
+    parts = []
+    with fitz.open(pdf_path) as doc:
+        for page_num in range(start, end):
+            page_text = doc.load_page(page_num).get_text("text", flags=text_flags, sort=False)
+            if page_text:
+                parts.append(page_text)
+                parts.append('\n\n')  # 每页之间添加空行分隔
+    return ''.join(parts)
+
+
+def _save_pdf_page(doc, page_num: int, output_file: str, output_format: str, dpi: int):
+    """将已打开文档中的单个页面栅格化并保存为图片"""
+    fitz = _get_fitz()  # PyMuPDF
+    
+    page = doc.load_page(page_num)
+    # 直接按目标DPI栅格化（PDF坐标系为72 DPI）
+    zoom = dpi / 72.0
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+    
+    # 保存图片
+    if output_format == 'JPEG':
+        # 由MuPDF直接编码JPEG，省去复制到PIL图像的开销
+        pix.save(output_file, output='jpeg', jpg_quality=95)
+    else:
+        Image = _get_pil_image()
+        # frombuffer按行跨度直接读取像素数据，避免frombytes内部再复制一份
+        img = Image.frombuffer("RGB", (pix.width, pix.height), pix.samples, "raw", "RGB", pix.stride, 1)
+        img.save(output_file, format=output_format, quality=95)
+        img = None
+    # 尽早释放像素缓冲区，让MuPDF复用这块内存
+    # 保存失败时 save 会直接抛出异常，无需每页再stat检查输出文件是否存在
+    pix = None
+
+
+def _render_pdf_pages(pdf_path: str, pages: list, output_format: str, dpi: int) -> int:
+    """渲染PDF中一段连续页面（[(页码, 输出文件), ...]）并保存为图片（在工作进程中执行），返回渲染的页数"""
+    fitz = _get_fitz()  # PyMuPDF
+    
+    # fitz.Document 不能在进程间共享，每个任务单独打开一次文档，处理完整段页面
+    with fitz.open(pdf_path) as doc:
+        for page_num, output_file in pages:
+            _save_pdf_page(doc, page_num, output_file, output_format, dpi)
+    return len(pages)
+
 
 class ConversionWorker:
     """转换工作类，用于执行文件转换任务"""
@@ -219,9 +866,27 @@ class ConversionWorker:
         self.input_file = input_file
         self.output_file = output_file
         self.file_type = file_type
-        self.settings = {}
+        # 输入/输出扩展名和输出主干路径在整个转换过程中不变，构造时计算一次
+        self._in_ext = Path(input_file).suffix.lower()
+        self._out_ext = Path(output_file).suffix.lower()
+        self._out_stem = str(Path(output_file).with_suffix(''))
+        self.settings = {
+            'target_dpi': 150,  # PDF转图片的输出分辨率
+            'hw_accel': True,  # 视频重新编码时自动使用可用的GPU硬件编码器
+            'priority': 'balanced',  # 软件编码的取舍：'speed' 使用最快的x264预设
+            'video_codec': 'libx264',  # FFmpeg重新编码视频时使用的编码器
+            'audio_codec': 'aac',
+            'video_quality': 23  # x264的CRF值，越小画质越高
+        }
         self.progress = 0
         self.cancelled = False
+        # ffprobe探测结果缓存
+        self._media_info: Optional[dict] = None
+        self._media_probed = False
+        # 输入文件的只读内存映射（惰性创建）
+        self._mm = None
+        # 硬件编码是否成功完成
+        self._hw_encoded = False
         
     async def run_conversion(self):
         """执行转换任务"""
@@ -230,22 +895,25 @@ class ConversionWorker:
             self.progress = 10
             yield self.progress
             
+            # 这些方法是异步生成器，需要遍历而不是await
             if self.file_type == '图片':
-                # 这些方法是异步生成器，需要遍历而不是await
-                async for progress in self._convert_image():
-                    yield progress
+                converter = self._convert_image()
             elif self.file_type == '音频':
-                async for progress in self._convert_audio():
-                    yield progress
+                converter = self._convert_audio()
             elif self.file_type == '视频':
-                async for progress in self._convert_video():
-                    yield progress
+                converter = self._convert_video()
             elif self.file_type == '文档':
-                async for progress in self._convert_document():
-                    yield progress
+                converter = self._convert_document()
             else:
                 raise ValueError(f"不支持的文件类型: {self.file_type}")
             
+            # 合并细碎的进度变化，只有增长足够多时才向界面汇报
+            last_reported = self.progress
+            async for progress in converter:
+                if progress - last_reported >= PROGRESS_MIN_STEP:
+                    last_reported = progress
+                    yield progress
+            
             if not self.cancelled:
                 self.progress = 100
                 yield self.progress
@@ -253,28 +921,74 @@ class ConversionWorker:
         except Exception as e:
             logger.error(f"转换失败: {str(e)}", exc_info=True)
             # 提供更详细的错误信息
-            import traceback
             error_details = f"{str(e)}\n\n详细信息:\n{traceback.format_exc()}"
             raise RuntimeError(error_details)
+        finally:
+            self._release_input_mmap()
+
+    async def run_in_process(self, pool: 'ConversionPool'):
+        """在常驻的转换进程中执行转换并逐个产出进度，界面所在进程不再与转换争用GIL；取消时通知工作进程停止"""
+        job_id, future = pool.submit(self.input_file, self.output_file, self.file_type,
+                                     settings=self.settings, report_progress=True)
+        try:
+            async for progress in pool.iter_progress(job_id, future):
+                if self.cancelled:
+                    break
+                self.progress = progress
+                yield progress
+            if not self.cancelled and await future is None:
+                # 工作进程中的转换被取消（如界面进程已发出取消请求）
+                self.cancelled = True
+        finally:
+            if not future.done():
+                pool.cancel_all()
+                # 不再等待该任务，取走它的结果以免出错时产生未读取异常的警告
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+    @property
+    def input_mmap(self):
+        """输入文件的只读内存映射，供PIL等直接读取页缓存，省去一次内核到用户态的复制"""
+        if self._mm is None:
+            with open(self.input_file, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # 图片解码基本是顺序读取，提示内核加大预读
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                self._mm.madvise(mmap.MADV_SEQUENTIAL)
+        return self._mm
+
+    def _release_input_mmap(self):
+        """释放输入文件的内存映射（Windows上映射未释放时无法删除临时文件）"""
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
 
     async def _convert_image(self):
         """转换图片文件"""
         if self.cancelled:
             return
         try:
-            from PIL import Image
             self.progress = 30
             yield self.progress
             
-            with Image.open(self.input_file) as img:
-                self.progress = 70
-                yield self.progress
-                
-                # 使用默认图片质量
-                img.save(self.output_file, quality=90)
+            # 解码和编码都是CPU密集操作，放到线程中执行以免阻塞事件循环
+            await asyncio.to_thread(self._do_image_convert, self.input_mmap, self.output_file)
+            
+            self.progress = 70
+            yield self.progress
         except Exception as e:
             raise RuntimeError(f"图片转换失败: {str(e)}") from e
 
+    @staticmethod
+    def _do_image_convert(source, output_file: str):
+        """同步执行图片格式转换（在工作线程中调用），source 可以是路径或文件对象"""
+        Image = _get_pil_image()
+        
+        save_args = IMAGE_SAVE_ARGS.get(os.path.splitext(output_file)[1].lower(), {'quality': 90})
+        with Image.open(source) as img:
+            if save_args.get('format') in RGB_ONLY_IMAGE_FORMATS and img.mode not in ('RGB', 'L', 'CMYK'):
+                img = img.convert('RGB')
+            img.save(output_file, **save_args)
+
     async def _convert_audio(self):
         """转换音频文件"""
         if self.cancelled:
@@ -283,17 +997,49 @@ class ConversionWorker:
             self.progress = 30
             yield self.progress
             
-            # 首先尝试使用pydub进行音频转换（支持更多格式）
+            # 输入输出格式相同，无需任何处理
+            if self._in_ext == self._out_ext:
+                await asyncio.to_thread(_link_or_copy, self.input_file, self.output_file)
+                self.progress = 70
+                yield self.progress
+                return
+            
+            # 首先尝试直接调用FFmpeg转码（边解码边编码，无需在内存中保存整段音频）
+            ffmpeg_path = FFMPEG_PATH
+            if ffmpeg_path:
+                try:
+                    ffmpeg = _get_ffmpeg()
+                    
+                    output_ext = self._out_ext
+                    if await self._can_copy_audio(ffmpeg_path):
+                        # 源音频编码与目标格式一致，直接复制音频流，完全跳过解码和编码
+                        codec_args = {'acodec': 'copy'}
+                    else:
+                        codec_args = AUDIO_CODEC_ARGS.get(output_ext, {})
+                    stream = (ffmpeg
+                        .input(self.input_file)
+                        .output(self.output_file, vn=None, **codec_args)
+                        .overwrite_output()
+                    )
+                    async for progress in self._run_ffmpeg(stream, ffmpeg_path):
+                        yield progress
+                    return  # 成功使用FFmpeg转换
+                    
+                except Exception as ffmpeg_error:
+                    # FFmpeg转换失败，尝试使用pydub
+                    logger.warning(f"FFmpeg转换失败，尝试pydub: {ffmpeg_error}")
+            
+            # 尝试使用pydub进行音频转换（支持更多格式）
             try:
-                from pydub import AudioSegment
-                
-                # 使用pydub加载音频文件
-                audio = AudioSegment.from_file(self.input_file)
+                # 使用pydub加载音频文件（解码较耗时，在线程中执行；常驻工作进程会复用同一输入的解码结果）
+                stat = os.stat(self.input_file)
+                audio = await asyncio.to_thread(_load_audio_segment, self.input_file,
+                                                stat.st_mtime_ns, stat.st_size)
                 self.progress = 50
                 yield self.progress
                 
                 # 使用默认音频设置导出为指定格式
-                file_ext = os.path.splitext(self.output_file)[1].lower()
+                file_ext = self._out_ext
                 
                 if file_ext == '.mp3':
                     audio.export(self.output_file, format="mp3", bitrate="192k")
@@ -326,29 +1072,21 @@ class ConversionWorker:
                 yield self.progress
                 
                 # 使用miniaudio处理音频文件
-                input_ext = os.path.splitext(self.input_file)[1].lower()
-                output_ext = os.path.splitext(self.output_file)[1].lower()
-                
-                # 获取音频信息
-                info = miniaudio.get_file_info(self.input_file)
-                logger.info(f"音频信息: {info.nchannels}声道, {info.sample_rate}Hz, {info.duration:.2f}秒")
+                input_ext = self._in_ext
+                output_ext = self._out_ext
                 
-                # 解码音频
+                # 解码音频（解码结果自带声道数、采样率和时长，无需再单独读取一次文件信息）
                 decoded = miniaudio.decode_file(self.input_file)
+                logger.info(f"音频信息: {decoded.nchannels}声道, {decoded.sample_rate}Hz, {decoded.duration:.2f}秒")
                 
                 # 根据输出格式决定处理方式
                 if output_ext == '.wav':
                     # 保存为WAV文件
-                    import wave
-                    with wave.open(self.output_file, 'w') as wf:
-                        wf.setnchannels(decoded.nchannels)
-                        wf.setsampwidth(2)  # 16-bit
-                        wf.setframerate(decoded.sample_rate)
-                        wf.writeframes(decoded.samples)
+                    await asyncio.to_thread(_write_pcm16_wav, self.output_file, decoded.nchannels,
+                                            decoded.sample_rate, decoded.samples)
                 else:
                     # 对于其他格式，执行文件复制并给出提示
-                    import shutil
-                    shutil.copy2(self.input_file, self.output_file)
+                    await _async_copyfile(self.input_file, self.output_file)
                     logger.info(f"注意: miniaudio不支持编码为{output_ext}格式，执行文件复制")
                 
                 self.progress = 70
@@ -365,24 +1103,21 @@ class ConversionWorker:
             yield self.progress
             
             # 纯Python音频转换（仅支持WAV相关格式）
-            input_ext = os.path.splitext(self.input_file)[1].lower()
-            output_ext = os.path.splitext(self.output_file)[1].lower()
+            input_ext = self._in_ext
+            output_ext = self._out_ext
             
             # 对于WAV文件的基本处理
             if input_ext == '.wav':
                 if output_ext == '.wav':
                     # WAV到WAV的复制
-                    import shutil
-                    shutil.copy2(self.input_file, self.output_file)
+                    await _async_copyfile(self.input_file, self.output_file)
                 else:
                     # 对于其他格式，提供说明或简单复制
-                    import shutil
-                    shutil.copy2(self.input_file, self.output_file)
+                    await _async_copyfile(self.input_file, self.output_file)
                     logger.info(f"注意：从WAV到{output_ext}的真实转换需要专门的编码库")
             else:
                 # 对于非WAV格式，尝试简单复制（可能不工作）
-                import shutil
-                shutil.copy2(self.input_file, self.output_file)
+                await _async_copyfile(self.input_file, self.output_file)
                 logger.info(f"注意：从{input_ext}到{output_ext}的真实转换需要专门的解码和编码库")
             
             self.progress = 70
@@ -402,125 +1137,244 @@ class ConversionWorker:
             self.progress = 30
             yield self.progress
             
-            # 首先尝试使用MoviePy进行视频转换（如果可用）
-            if MOVIEPY_AVAILABLE:
-                try:
-                    from moviepy.editor import VideoFileClip
-                    import os
-                    
-                    # 使用MoviePy加载视频文件
-                    video = VideoFileClip(self.input_file)
-                    self.progress = 50
-                    yield self.progress
-                    
-                    # 获取输出文件扩展名
-                    output_ext = os.path.splitext(self.output_file)[1].lower()
-                    
-                    # 根据输出格式进行相应处理
-                    if output_ext in ['.mp4', '.avi', '.mov', '.mkv', '.wmv']:
-                        # 对于支持的格式，直接写入
-                        video.write_videofile(
-                            self.output_file,
-                            codec='libx264',
-                            audio_codec='aac',
-                            temp_audiofile='temp-audio.m4a',
-                            remove_temp=True,
-                            verbose=False,
-                            logger=None
-                        )
-                    else:
-                        # 对于不直接支持的格式，使用默认设置
-                        video.write_videofile(
-                            self.output_file,
-                            temp_audiofile='temp-audio.m4a',
-                            remove_temp=True,
-                            verbose=False,
-                            logger=None
-                        )
-                    
-                    # 关闭视频文件
-                    video.close()
-                    self.progress = 70
-                    yield self.progress
-                    return  # 成功使用MoviePy转换
-                    
-                except Exception as moviepy_error:
-                    # MoviePy转换失败，尝试使用FFmpeg
-                    logger.warning(f"MoviePy转换失败，尝试FFmpeg: {moviepy_error}")
-                    pass
+            # 输入输出格式相同，无需任何处理
+            if self._in_ext == self._out_ext:
+                await asyncio.to_thread(_link_or_copy, self.input_file, self.output_file)
+                self.progress = 70
+                yield self.progress
+                return
             
-            # 尝试使用FFmpeg进行视频转换
-            try:
-                import ffmpeg
-                import shutil
-                import os
-                
-                # 检查ffmpeg是否可用
-                ffmpeg_path = shutil.which("ffmpeg")
-                if not ffmpeg_path:
-                    # 尝试使用相对路径或打包环境中的ffmpeg
-                    possible_paths = [
-                        "ffmpeg",
-                        "./ffmpeg",
-                        "./ffmpeg.exe",
-                        os.path.join(os.path.dirname(__file__), "ffmpeg"),
-                        os.path.join(os.path.dirname(__file__), "ffmpeg.exe")
-                    ]
-                    
-                    for path in possible_paths:
-                        if os.path.exists(path) or shutil.which(path):
-                            ffmpeg_path = path
-                            break
-                
-                # 如果仍然找不到，提供更友好的错误信息
-                if not ffmpeg_path:
-                    raise RuntimeError(
-                        "未找到FFmpeg，视频转换需要FFmpeg支持。\n\n"
-                        "解决方案:\n"
-                        "1. 自动下载: 运行 install_ffmpeg.py 脚本自动安装FFmpeg\n"
-                        "2. 手动安装: 访问 https://ffmpeg.org/download.html 下载并安装\n"
-                        "3. 打包应用: 将ffmpeg.exe文件放在程序同目录下\n\n"
-                        "注意: 音频转换不需要FFmpeg，可以正常使用。"
-                    )
-                
-                # 使用默认视频设置
+            # 仅更换容器且原有编码可直接封装时，使用流复制（-c copy），无需重新编码
+            if FFMPEG_PATH and await self._can_stream_copy(FFMPEG_PATH):
                 try:
-                    (ffmpeg
+                    ffmpeg = _get_ffmpeg()
+                    # map 0 保留所有已校验过编码的音视频轨（默认只会各选一条），-sn/-dn 丢弃目标容器未必支持的字幕和数据流
+                    stream = (ffmpeg
                         .input(self.input_file)
-                        .output(self.output_file, 
-                                vcodec='libx264', 
-                                acodec='aac', 
-                                crf=23, 
-                                strict='experimental')
+                        .output(self.output_file, c='copy', map='0', sn=None, dn=None)
                         .overwrite_output()
-                        .run(cmd=ffmpeg_path, capture_stdout=True, capture_stderr=True)
                     )
-                    self.progress = 70
-                    yield self.progress
-                except ffmpeg.Error as e:
-                    # 获取详细的错误信息
-                    error_msg = f"视频转换失败: {e.stderr.decode('utf-8') if e.stderr else str(e)}"
-                    raise RuntimeError(error_msg) from e
-                except Exception as e:
-                    error_msg = f"视频转换过程中发生未知错误: {str(e)}"
-                    raise RuntimeError(error_msg) from e
+                    async for progress in self._run_ffmpeg(stream, FFMPEG_PATH):
+                        yield progress
+                    return  # 成功使用流复制完成转换
                     
-            except Exception as ffmpeg_error:
-                # FFmpeg处理失败，尝试使用纯Python方法
-                logger.error(f"FFmpeg处理失败: {ffmpeg_error}")
-                raise RuntimeError(f"视频转换失败: 未找到可用的视频处理库(MoviePy或FFmpeg)") from ffmpeg_error
-                
+                except Exception as remux_error:
+                    # 流复制失败，回退到重新编码
+                    logger.warning(f"流复制失败，改为重新编码: {remux_error}")
+            
+            # 需要重新编码时，优先尝试GPU硬件编码（编码器列表中有但没有对应显卡时会失败并回退）
+            if FFMPEG_PATH and self.settings.get('hw_accel'):
+                # 失败的流复制可能已把进度推到70，进度不能作为成功与否的依据，重置后以显式标志判断
+                self.progress = 30
+                async for progress in self._hw_encode_video():
+                    yield progress
+                if self._hw_encoded or self.cancelled:
+                    return  # 成功使用硬件编码器转换
+            
+            # x264预设：比默认的medium快得多，'speed' 优先级下使用最快的预设
+            x264_preset = 'ultrafast' if self.settings.get('priority') == 'speed' else 'veryfast'
+            
+            # 主要方式：直接调用FFmpeg转码，解码、缩放、编码都在FFmpeg内部完成，不经过Python逐帧处理
+            if FFMPEG_PATH:
+                ffmpeg = _get_ffmpeg()
+                output_args = {
+                    'vcodec': self.settings.get('video_codec', 'libx264'),
+                    'acodec': self.settings.get('audio_codec', 'aac'),
+                    'crf': self.settings.get('video_quality', 23),
+                    'preset': x264_preset,
+                    'threads': 0  # 由FFmpeg按CPU核数自动选择
+                }
+                if self._out_ext in ('.mp4', '.mov'):
+                    # 把moov索引移到文件开头，下载过程中即可开始播放
+                    output_args['movflags'] = '+faststart'
+                stream = (ffmpeg
+                    .input(self.input_file)
+                    .output(self.output_file, **output_args)
+                    .overwrite_output()
+                )
+                # 以异步子进程运行FFmpeg，不阻塞事件循环，并实时汇报进度
+                async for progress in self._run_ffmpeg(stream, FFMPEG_PATH):
+                    yield progress
+                return
+            
+            # 找不到FFmpeg可执行文件时，最后尝试MoviePy（其依赖的imageio-ffmpeg自带FFmpeg）
+            moviepy_editor = _get_moviepy()
+            if moviepy_editor is None:
+                raise RuntimeError(
+                    "未找到FFmpeg，视频转换需要FFmpeg支持。\n\n"
+                    "解决方案:\n"
+                    "1. 自动下载: 运行 install_ffmpeg.py 脚本自动安装FFmpeg\n"
+                    "2. 手动安装: 访问 https://ffmpeg.org/download.html 下载并安装\n"
+                    "3. 打包应用: 将ffmpeg.exe文件放在程序同目录下\n\n"
+                    "注意: 音频转换不需要FFmpeg，可以正常使用。"
+                )
+            
+            # 每个转换任务使用独立的临时音频文件，避免并发转换相互覆盖或误删
+            temp_audiofile = os.path.join(
+                tempfile.gettempdir(), f'qc_{os.getpid()}_{id(self)}_audio.m4a')
+            
+            # 使用MoviePy加载视频文件
+            video = moviepy_editor.VideoFileClip(self.input_file)
+            self.progress = 50
+            yield self.progress
+            
+            try:
+                video.write_videofile(
+                    self.output_file,
+                    codec='libx264',
+                    audio_codec='aac',
+                    temp_audiofile=temp_audiofile,
+                    remove_temp=True,
+                    verbose=False,
+                    logger=None,
+                    threads=os.cpu_count(),
+                    preset=x264_preset
+                )
+            finally:
+                # 关闭视频文件
+                video.close()
+            self.progress = 70
+            yield self.progress
         except Exception as e:
             raise RuntimeError(f"视频转换失败: {str(e)}") from e
 
+    async def _hw_encode_video(self):
+        """依次尝试可用的硬件编码器，成功时将 _hw_encoded 置为True，全部失败时不抛出异常"""
+        self._hw_encoded = False
+        output_ext = self._out_ext
+        if output_ext not in HW_ENCODE_CONTAINERS:
+            return
+        
+        ffmpeg = _get_ffmpeg()
+        for encoder in await asyncio.to_thread(_probe_hw_encoders):
+            if self.cancelled:
+                return
+            try:
+                stream = (ffmpeg
+                    .input(self.input_file, hwaccel='auto')
+                    .output(self.output_file,
+                            vcodec=encoder,
+                            acodec='aac',
+                            **HW_H264_ENCODERS[encoder])
+                    .overwrite_output()
+                )
+                async for progress in self._run_ffmpeg(stream, FFMPEG_PATH):
+                    yield progress
+                # 被取消时 _run_ffmpeg 会提前结束，不算成功
+                self._hw_encoded = not self.cancelled
+                return
+            except Exception as hw_error:
+                logger.warning(f"硬件编码器 {encoder} 转换失败: {hw_error}")
+
+    async def _probe_media(self, ffmpeg_path: str) -> Optional[dict]:
+        """使用ffprobe获取输入媒体信息（同一任务只探测一次），失败时返回None"""
+        if self._media_probed:
+            return self._media_info
+        self._media_probed = True
+        try:
+            ffmpeg = _get_ffmpeg()
+            
+            # ffprobe通常与ffmpeg位于同一目录
+            ffmpeg_dir = os.path.dirname(ffmpeg_path)
+            ffprobe_name = 'ffprobe.exe' if ffmpeg_path.lower().endswith('.exe') else 'ffprobe'
+            ffprobe_path = os.path.join(ffmpeg_dir, ffprobe_name) if ffmpeg_dir else ffprobe_name
+            
+            self._media_info = await asyncio.to_thread(ffmpeg.probe, self.input_file, cmd=ffprobe_path)
+        except Exception as e:
+            logger.warning(f"无法获取媒体信息: {e}")
+        return self._media_info
+
+    async def _probe_duration(self, ffmpeg_path: str) -> Optional[float]:
+        """获取输入媒体的时长（秒），失败时返回None"""
+        info = await self._probe_media(ffmpeg_path)
+        try:
+            return float(info['format']['duration'])
+        except (TypeError, KeyError, ValueError):
+            logger.warning("无法获取媒体时长，进度将不会实时更新")
+            return None
+
+    async def _can_stream_copy(self, ffmpeg_path: str) -> bool:
+        """判断输入的音视频编码能否不经重新编码直接封装进目标容器"""
+        output_ext = self._out_ext
+        if output_ext not in STREAM_COPY_CODECS:
+            return False
+        
+        info = await self._probe_media(ffmpeg_path)
+        if not info:
+            return False
+        
+        allowed_video, allowed_audio = STREAM_COPY_CODECS[output_ext]
+        for stream in info.get('streams', []):
+            codec_type = stream.get('codec_type')
+            codec_name = stream.get('codec_name')
+            if codec_type == 'video' and allowed_video is not None and codec_name not in allowed_video:
+                return False
+            if codec_type == 'audio' and allowed_audio is not None and codec_name not in allowed_audio:
+                return False
+        return True
+
+    async def _can_copy_audio(self, ffmpeg_path: str) -> bool:
+        """判断输入的第一条音频流能否不经重新编码直接放入目标音频格式"""
+        allowed = AUDIO_COPY_CODECS.get(self._out_ext)
+        info = await self._probe_media(ffmpeg_path) if allowed else None
+        if not info:
+            return False
+        for stream in info.get('streams', []):
+            if stream.get('codec_type') == 'audio':
+                return stream.get('codec_name') in allowed
+        return False
+
+    async def _run_ffmpeg(self, stream, ffmpeg_path: str, start: int = 30, end: int = 70):
+        """以异步子进程运行FFmpeg命令，解析 -progress 输出并按时长折算进度"""
+        duration = await self._probe_duration(ffmpeg_path)
+        args = stream.global_args('-progress', 'pipe:1', '-nostats').compile(cmd=ffmpeg_path)
+        
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        # 并行读取stderr，避免管道写满导致FFmpeg阻塞
+        stderr_task = asyncio.ensure_future(proc.stderr.read())
+        try:
+            last_progress = start
+            async for line in proc.stdout:
+                if self.cancelled:
+                    return
+                key, _, value = line.decode('utf-8', errors='ignore').strip().partition('=')
+                # out_time_ms 实际单位也是微秒（FFmpeg的历史遗留问题）
+                if key in ('out_time_us', 'out_time_ms') and duration and value.isdigit():
+                    ratio = min(int(value) / 1_000_000 / duration, 1.0)
+                    progress = start + int(ratio * (end - start))
+                    if progress > last_progress:
+                        last_progress = progress
+                        self.progress = progress
+                        yield progress
+            
+            returncode = await proc.wait()
+            stderr = await stderr_task
+            if returncode != 0:
+                raise RuntimeError(f"FFmpeg执行失败: {stderr.decode('utf-8', errors='ignore')}")
+            
+            self.progress = end
+            yield self.progress
+        finally:
+            # 被取消或出错时结束FFmpeg进程
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            if not stderr_task.done():
+                stderr_task.cancel()
+
     async def _convert_document(self):
         """转换文档文件"""
         if self.cancelled:
             return
         try:
             # 仅支持部分文档格式转换
-            ext_in = os.path.splitext(self.input_file)[1].lower()
-            ext_out = os.path.splitext(self.output_file)[1].lower()
+            ext_in = self._in_ext
+            ext_out = self._out_ext
             
             self.progress = 30
             yield self.progress
@@ -568,48 +1422,61 @@ class ConversionWorker:
         if self.cancelled:
             return
         try:
-            import fitz  # PyMuPDF
-            from PIL import Image
-            import os
+            fitz = _get_fitz()  # PyMuPDF
             
             # 检查输入文件是否存在
             if not os.path.exists(self.input_file):
                 raise FileNotFoundError(f"输入文件不存在: {self.input_file}")
             
             doc = fitz.open(self.input_file)
+            page_count = len(doc)
+            doc.close()
             
             # 检查PDF是否有页面
-            if len(doc) == 0:
-                doc.close()
+            if page_count == 0:
                 raise RuntimeError("PDF文件没有页面内容")
             
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                # 使用更高的分辨率以获得更好的图像质量
-                pix = page.get_pixmap(matrix=fitz.Matrix(3, 3))  # 3倍分辨率
-                img_data = pix.tobytes("ppm")
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                
-                if len(doc) > 1:
-                    # 如果有多个页面，为每个页面创建单独的图片文件
-                    base_name = os.path.splitext(self.output_file)[0]
-                    output_file = f"{base_name}_{page_num + 1:02d}{os.path.splitext(self.output_file)[1]}"
-                else:
-                    output_file = self.output_file
-                
-                # 保存图片
-                output_format = os.path.splitext(self.output_file)[1].upper()[1:]  # 获取文件扩展名作为格式
-                if output_format == 'JPG':
-                    output_format = 'JPEG'
-                
-                img.save(output_file, format=output_format, quality=95)
-                
-                # 检查输出文件是否创建成功
-                if not os.path.exists(output_file):
-                    doc.close()
-                    raise RuntimeError(f"图片文件未能成功创建: {output_file}")
+            dpi = self.settings.get('target_dpi', 150)
             
-            doc.close()
+            # 获取文件扩展名作为保存格式
+            output_format = self._out_ext[1:].upper()
+            if output_format == 'JPG':
+                output_format = 'JPEG'
+            
+            if page_count == 1:
+                # 单页PDF无需启动进程池，直接在线程中渲染
+                await asyncio.to_thread(
+                    _render_pdf_pages, self.input_file, [(0, self.output_file)], output_format, dpi
+                )
+                return
+            
+            # 多页PDF：各页面互不依赖，按连续页段分发到进程池并行渲染
+            # 每个工作进程分到约两段，每段只打开一次文档，同时保留足够的进度更新粒度
+            loop = asyncio.get_running_loop()
+            pool = _get_pdf_pool()
+            # 如果有多个页面，为每个页面创建单独的图片文件
+            pages = [(page_num, f"{self._out_stem}_{page_num + 1:02d}{self._out_ext}")
+                     for page_num in range(page_count)]
+            chunk_size = max(1, -(-page_count // (_pdf_pool_workers * 2)))
+            futures = [
+                loop.run_in_executor(pool, _render_pdf_pages, self.input_file,
+                                     pages[i:i + chunk_size], output_format, dpi)
+                for i in range(0, page_count, chunk_size)
+            ]
+            
+            try:
+                done = 0
+                for future in asyncio.as_completed(futures):
+                    done += await future
+                    if self.cancelled:
+                        return
+                    # 根据已完成的页数更新进度
+                    self.progress = 30 + int(done / page_count * 40)
+                    yield self.progress
+            finally:
+                # 取消或出错时丢弃尚未开始的页面任务
+                for future in futures:
+                    future.cancel()
         except FileNotFoundError:
             raise
         except Exception as e:
@@ -620,8 +1487,7 @@ class ConversionWorker:
         if self.cancelled:
             return
         try:
-            from PIL import Image
-            import os
+            Image = _get_pil_image()
             
             # 检查输入文件是否存在
             if not os.path.exists(self.input_file):
@@ -629,20 +1495,13 @@ class ConversionWorker:
             
             # 支持的图片格式列表
             supported_formats = ['.jpg', '.jpeg', '.png', '.webp', '.bmp', '.tiff']
-            file_ext = os.path.splitext(self.input_file)[1].lower()
+            file_ext = self._in_ext
             
             if file_ext not in supported_formats:
                 raise ValueError(f"不支持的图片格式: {file_ext}")
             
-            # 打开图片
-            img = Image.open(self.input_file)
-            
-            # 确保图片模式兼容PDF
-            if img.mode in ("RGBA", "P"):
-                img = img.convert("RGB")
-            
-            # 保存为PDF
-            img.save(self.output_file, format='PDF', resolution=100.0)
+            # 在线程中完成解码和PDF编码，避免阻塞事件循环
+            await asyncio.to_thread(self._do_image_to_pdf, self.input_mmap, self.output_file)
             
             # 检查输出文件是否创建成功
             if not os.path.exists(self.output_file):
@@ -655,98 +1514,77 @@ class ConversionWorker:
         except Exception as e:
             raise RuntimeError(f"图片转PDF失败: {str(e)}") from e
 
+    @staticmethod
+    def _do_image_to_pdf(source, output_file: str):
+        """图片转PDF的阻塞部分：按EXIF方向摆正，多帧图片（如多页TIFF）输出为多页PDF"""
+        Image = _get_pil_image()
+        from PIL import ImageOps, ImageSequence
+        
+        with Image.open(source) as img:
+            pages = []
+            for frame in ImageSequence.Iterator(img):
+                page = ImageOps.exif_transpose(frame)
+                # 确保图片模式兼容PDF
+                if page.mode in ("RGBA", "P"):
+                    page = page.convert("RGB")
+                pages.append(page)
+            
+            # 保存为PDF
+            pages[0].save(output_file, format='PDF', resolution=100.0,
+                          save_all=True, append_images=pages[1:])
+
     async def _txt_to_pdf(self):
         """文本转PDF"""
         if self.cancelled:
             return
         try:
-            from reportlab.pdfgen import canvas
             from reportlab.lib.pagesizes import letter
-            from reportlab.pdfbase import pdfmetrics
-            from reportlab.pdfbase.ttfonts import TTFont
-            import os
+            from reportlab.lib.styles import ParagraphStyle
+            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
             
             # 检查输入文件是否存在
             if not os.path.exists(self.input_file):
                 raise FileNotFoundError(f"输入文件不存在: {self.input_file}")
             
-            # 创建PDF
-            c = canvas.Canvas(self.output_file, pagesize=letter)
-            width, height = letter
-            
-            # 读取文本文件，尝试多种编码
-            lines = []
-            encodings = ['utf-8', 'gbk', 'gb2312', 'latin-1']
-            file_read = False
-            
-            for encoding in encodings:
-                try:
-                    with open(self.input_file, 'r', encoding=encoding) as f:
-                        lines = f.readlines()
-                    file_read = True
-                    break
-                except UnicodeDecodeError:
-                    continue
-            
-            if not file_read:
-                raise RuntimeError("无法读取文本文件，可能的编码问题")
-            
-            # 尝试注册并使用中文字体
-            font_registered = False
-            try:
-                # 在Windows上尝试使用系统字体
-                if os.name == 'nt':  # Windows
-                    font_path = "C:/Windows/Fonts/simsun.ttc"  # 宋体
-                    if os.path.exists(font_path):
-                        pdfmetrics.registerFont(TTFont('SimSun', font_path))
-                        c.setFont("SimSun", 12)
-                        font_registered = True
-                # 在其他系统上可以尝试其他字体路径
-            except:
-                pass
-            
-            # 如果中文字体注册失败，使用默认字体
-            if not font_registered:
-                c.setFont("Helvetica", 12)
-            
-            y_position = height - 50
+            # 只读取一次原始字节，识别编码后一次性解码
+            raw = await asyncio.to_thread(Path(self.input_file).read_bytes)
+            text = await asyncio.to_thread(_decode_text, raw)
+            lines = text.splitlines()
+            
+            # 使用中文字体（注册结果在进程内缓存），不可用时回退到默认字体
+            font_name = _register_cjk_font()
+            style = ParagraphStyle(
+                'TextBody',
+                fontName=font_name,
+                fontSize=12,
+                leading=15,
+                spaceAfter=15,
+                # 中文文本没有空格分词，需要按字符换行
+                wordWrap='CJK' if font_name != 'Helvetica' else None
+            )
             
-            # 写入文本
+            # 每行文本作为一个段落，由reportlab负责自动换行和分页
+            story = []
             for line in lines:
-                # 处理过长的行，进行换行
                 text = line.strip()
-                while len(text) > 80:  # 如果行长度超过80字符
-                    c.drawString(50, y_position, text[:80])
-                    text = text[80:]
-                    y_position -= 15
-                    
-                    # 如果到达页面底部，创建新页面
-                    if y_position < 50:
-                        c.showPage()
-                        # 重新设置字体
-                        if font_registered:
-                            c.setFont("SimSun", 12)
-                        else:
-                            c.setFont("Helvetica", 12)
-                        y_position = height - 50
-                
-                # 绘制剩余文本（或未超长的整行）
-                if text:  # 确保有文本需要绘制
-                    c.drawString(50, y_position, text)
-                    y_position -= 15
-                y_position -= 15
-                
-                # 如果到达页面底部，创建新页面
-                if y_position < 50:
-                    c.showPage()
-                    # 重新设置字体
-                    if font_registered:
-                        c.setFont("SimSun", 12)
-                    else:
-                        c.setFont("Helvetica", 12)
-                    y_position = height - 50
+                if text:
+                    story.append(Paragraph(escape(text), style))
+                else:
+                    story.append(Spacer(1, 15))
             
-            c.save()
+            self.progress = 50
+            yield self.progress
+            
+            # 创建PDF（排版较耗时，在线程中执行）
+            doc = SimpleDocTemplate(
+                self.output_file,
+                pagesize=letter,
+                leftMargin=50,
+                rightMargin=50,
+                topMargin=50,
+                bottomMargin=50
+            )
+            await asyncio.to_thread(doc.build, story)
             
             # 检查输出文件是否创建成功
             if not os.path.exists(self.output_file):
@@ -762,30 +1600,40 @@ class ConversionWorker:
         if self.cancelled:
             return
         try:
-            import fitz  # PyMuPDF
-            import os
+            fitz = _get_fitz()  # PyMuPDF
             
             # 检查输入文件是否存在
             if not os.path.exists(self.input_file):
                 raise FileNotFoundError(f"输入文件不存在: {self.input_file}")
             
-            # 打开PDF文档
-            doc = fitz.open(self.input_file)
-            text = ""
-            
-            # 提取所有页面的文本
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                page_text = page.get_text()
-                if page_text:
-                    text += page_text + '\n\n'  # 每页之间添加空行分隔
+            with fitz.open(self.input_file) as doc:
+                total_pages = len(doc)
             
-            # 关闭文档
-            doc.close()
+            # 按页段提取文本：页数较少时直接在线程中提取，否则各页段分发到进程池并行提取
+            batches = [(start, min(start + PDF_TEXT_BATCH_PAGES, total_pages))
+                       for start in range(0, total_pages, PDF_TEXT_BATCH_PAGES)]
+            if len(batches) <= 1:
+                futures = [asyncio.ensure_future(asyncio.to_thread(
+                    _extract_pdf_text, self.input_file, start, end)) for start, end in batches]
+            else:
+                loop = asyncio.get_running_loop()
+                pool = _get_pdf_pool()
+                futures = [loop.run_in_executor(pool, _extract_pdf_text, self.input_file, start, end)
+                           for start, end in batches]
             
-            # 写入文本文件
-            with open(self.output_file, 'w', encoding='utf-8') as f:
-                f.write(text)
+            try:
+                # 按页序依次写入已提取的页段，不在内存中拼接整篇文本
+                with open(self.output_file, 'w', encoding='utf-8', buffering=1 << 20) as f:
+                    for (_, batch_end), future in zip(batches, futures):
+                        f.write(await future)
+                        if self.cancelled:
+                            return
+                        self.progress = 30 + int(batch_end / total_pages * 40)
+                        yield self.progress
+            finally:
+                # 取消或出错时丢弃尚未开始的页段任务
+                for future in futures:
+                    future.cancel()
             
             # 检查输出文件是否创建成功
             if not os.path.exists(self.output_file):
@@ -808,24 +1656,15 @@ class ConversionWorker:
             try:
                 # 注意: python-docx 主要处理 DOCX 格式，对于 DOC 格式支持有限
                 # 这里我们尝试使用 win32com.client (Windows) 或 libreoffice (跨平台) 来处理
-                import os
-                
                 # 模拟进度更新
                 yield 30
                 
                 # 检查操作系统
-                import platform
                 if platform.system() == "Windows":
                     # 在 Windows 上尝试使用 win32com.client
                     try:
-                        import win32com.client
-                        # 使用 Word 应用程序打开 DOC 文件并另存为 PDF
-                        word = win32com.client.Dispatch("Word.Application")
-                        word.visible = False
-                        doc = word.Documents.Open(os.path.abspath(self.input_file))
-                        doc.SaveAs(os.path.abspath(self.output_file), FileFormat=17)  # 17 表示 PDF 格式
-                        doc.Close()
-                        word.Quit()
+                        # Word 自动化调用是阻塞的，放到线程中执行
+                        await asyncio.to_thread(self._word_save_as_pdf, self.input_file, self.output_file)
                         # 模拟进度更新
                         yield 90
                         yield 100
@@ -834,28 +1673,30 @@ class ConversionWorker:
                         logger.warning(f"使用 Word 应用程序转换失败: {e}")
                         pass
                 
-                # 跨平台方案：尝试使用 libreoffice
+                # 跨平台方案：优先复用常驻的 LibreOffice 服务（UNO）
+                try:
+                    if await _soffice_convert_to_pdf(self.input_file, self.output_file):
+                        if os.path.exists(self.output_file):
+                            yield 90
+                            yield 100
+                            return
+                except Exception as e:
+                    logger.warning(f"使用 LibreOffice 服务转换失败，改用命令行转换: {e}")
+                
+                # 无法使用UNO时退回到每次启动一次 libreoffice 命令行
                 try:
-                    import subprocess
-                    import shutil
-                    
                     # 检查 libreoffice 是否可用
-                    libreoffice_path = shutil.which("libreoffice")
-                    if not libreoffice_path:
-                        # 尝试使用 soffice (libreoffice 的命令行工具)
-                        libreoffice_path = shutil.which("soffice")
-                    
-                    if libreoffice_path:
+                    if LIBREOFFICE_PATH:
                         # 使用 libreoffice 转换
                         cmd = [
-                            libreoffice_path,
+                            LIBREOFFICE_PATH,
                             "--headless",
                             "--convert-to", "pdf",
                             "--outdir", os.path.dirname(self.output_file),
                             self.input_file
                         ]
                         
-                        result = subprocess.run(cmd, capture_output=True, text=True)
+                        result = await asyncio.to_thread(subprocess.run, cmd, capture_output=True, text=True)
                         if result.returncode == 0:
                             # 重命名输出文件以匹配期望的输出文件名
                             input_name = os.path.splitext(os.path.basename(self.input_file))[0]
@@ -889,6 +1730,26 @@ class ConversionWorker:
         except Exception as e:
             raise RuntimeError(f"DOC 转 PDF 失败: {str(e)}") from e
 
+    @staticmethod
+    def _word_save_as_pdf(input_file: str, output_file: str):
+        """使用 Word 应用程序打开 DOC 文件并另存为 PDF（阻塞调用，Windows）"""
+        import pythoncom
+        import win32com.client
+        
+        # 在线程中使用COM前需要先初始化
+        pythoncom.CoInitialize()
+        try:
+            word = win32com.client.Dispatch("Word.Application")
+            word.visible = False
+            try:
+                doc = word.Documents.Open(os.path.abspath(input_file))
+                doc.SaveAs(os.path.abspath(output_file), FileFormat=17)  # 17 表示 PDF 格式
+                doc.Close()
+            finally:
+                word.Quit()
+        finally:
+            pythoncom.CoUninitialize()
+
     async def _docx_to_pdf(self):
         """DOCX转PDF"""
         # 模拟进度更新
@@ -898,7 +1759,6 @@ class ConversionWorker:
             return
         try:
             from docx2pdf import convert
-            import os
             
             # 模拟进度更新
             yield 30
@@ -907,7 +1767,8 @@ class ConversionWorker:
             if not os.path.exists(self.input_file):
                 raise FileNotFoundError(f"输入文件不存在: {self.input_file}")
             
-            convert(self.input_file, self.output_file)
+            # docx2pdf 会驱动Word完成转换，放到线程中执行以免阻塞界面
+            await asyncio.to_thread(convert, self.input_file, self.output_file)
             
             # 模拟进度更新
             yield 90
@@ -936,10 +1797,6 @@ class ConversionWorker:
         if self.cancelled:
             return
         try:
-            import fitz  # PyMuPDF
-            from docx import Document
-            import os
-            
             # 模拟进度更新
             yield 20
             
@@ -947,42 +1804,11 @@ class ConversionWorker:
             if not os.path.exists(self.input_file):
                 raise FileNotFoundError(f"输入文件不存在: {self.input_file}")
             
-            # 打开PDF文档
-            doc = fitz.open(self.input_file)
-            docx_doc = Document()
-            
-            # 添加标题
-            docx_doc.add_heading('转换自PDF文件', 0)
-            
-            # 模拟进度更新
-            yield 30
-            
-            # 提取所有页面的文本并添加到DOCX文档
-            total_pages = len(doc)
-            for page_num in range(total_pages):
-                page = doc.load_page(page_num)
-                text = page.get_text()
-                
-                if text and text.strip():  # 确保文本不为空
-                    # 添加页面分隔标题
-                    docx_doc.add_heading(f'页面 {page_num+1}', level=1)
-                    # 添加文本内容
-                    docx_doc.add_paragraph(text.strip())
-                    # 添加页面分隔符（除了最后一页）
-                    if page_num < total_pages - 1:
-                        docx_doc.add_page_break()
-                elif page_num < total_pages - 1:  # 即使页面无文本也要添加分页符（除了最后一页）
-                    docx_doc.add_page_break()
-                
-                # 根据处理进度更新进度值
-                progress = 30 + int((page_num + 1) / total_pages * 60)
+            # 解析PDF和生成DOCX都在线程中进行，进度通过队列传回事件循环
+            async for progress in self._iter_thread_progress(self._pdf_to_docx_sync):
                 yield progress
-            
-            # 关闭PDF文档
-            doc.close()
-            
-            # 保存DOCX文档
-            docx_doc.save(self.output_file)
+            if self.cancelled:
+                return
             
             # 模拟进度更新
             yield 95
@@ -997,10 +1823,231 @@ class ConversionWorker:
         except Exception as e:
             raise RuntimeError(f"PDF转DOCX失败: {str(e)}") from e
 
+    def _pdf_to_docx_sync(self, report):
+        """PDF转DOCX的阻塞部分（在线程中执行），通过 report 回调汇报进度"""
+        fitz = _get_fitz()  # PyMuPDF
+        
+        docx_doc = _DocxWriter()
+        
+        # 添加标题
+        docx_doc.add_heading('转换自PDF文件', 0)
+        report(30)
+        
+        # 可选依赖：pymupdf4llm 在MuPDF中完成版面分析，能保留标题等结构
+        if _module_available('pymupdf4llm'):
+            import pymupdf4llm
+        else:
+            pymupdf4llm = None
+        
+        text_flags = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_PRESERVE_LIGATURES
+        with fitz.open(self.input_file) as doc:
+            total_pages = len(doc)
+            page_markdowns = None
+            if pymupdf4llm is not None:
+                page_markdowns = [chunk['text'] for chunk in pymupdf4llm.to_markdown(doc, page_chunks=True)]
+            
+            # 提取所有页面的文本并添加到DOCX文档
+            for page_num in range(total_pages):
+                if self.cancelled:
+                    return
+                if page_markdowns is not None:
+                    paragraphs = None
+                    has_text = bool(page_markdowns[page_num].strip())
+                else:
+                    page = doc.load_page(page_num)
+                    # 按文本块提取，每个块对应一个段落；块元组第7项为类型，0为文本、1为图片
+                    # 显式指定flags（不含 TEXT_PRESERVE_IMAGES），MuPDF不再为图片块解码图像数据
+                    paragraphs = [block[4].strip() for block in page.get_text("blocks", flags=text_flags)
+                                  if block[6] == 0 and block[4].strip()]
+                    has_text = bool(paragraphs)
+                
+                if has_text:  # 确保文本不为空
+                    # 添加页面分隔标题（不再插入分页符，由Word自然分页）
+                    docx_doc.add_heading(f'页面 {page_num+1}', level=1)
+                    # 添加文本内容
+                    if paragraphs is None:
+                        self._add_markdown_to_docx(docx_doc, page_markdowns[page_num])
+                    else:
+                        for paragraph in paragraphs:
+                            docx_doc.add_paragraph(paragraph)
+                
+                # 每处理一批页面释放一次MuPDF内部缓存并更新进度，控制内存占用
+                if (page_num + 1) % PDF_DOCX_BATCH_PAGES == 0 or page_num == total_pages - 1:
+                    fitz.TOOLS.store_shrink(100)
+                    report(30 + int((page_num + 1) / total_pages * 60))
+        
+        # 保存DOCX文档
+        docx_doc.save(self.output_file)
+
+    @staticmethod
+    def _add_markdown_to_docx(docx_doc, markdown: str):
+        """把Markdown文本写入DOCX：# 标题映射为对应级别的标题，空行分隔的文本作为段落"""
+        lines = []
+        
+        def flush_paragraph():
+            if lines:
+                docx_doc.add_paragraph('\n'.join(lines))
+                lines.clear()
+        
+        for line in markdown.splitlines():
+            line = line.strip().replace('**', '')
+            if not line:
+                flush_paragraph()
+                continue
+            heading = MARKDOWN_HEADING_RE.fullmatch(line)
+            if heading:
+                flush_paragraph()
+                docx_doc.add_heading(heading.group(2), level=len(heading.group(1)))
+            else:
+                lines.append(line)
+        flush_paragraph()
+
+    async def _iter_thread_progress(self, func, *args):
+        """在线程中执行阻塞函数 func(report, *args)，并逐个产出它通过 report 汇报的进度"""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        def report(progress: int):
+            loop.call_soon_threadsafe(queue.put_nowait, progress)
+        
+        def run():
+            try:
+                return func(report, *args)
+            finally:
+                # 结束标记，保证等待进度的一方总能退出
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+        
+        task = asyncio.ensure_future(asyncio.to_thread(run))
+        while (progress := await queue.get()) is not None:
+            yield progress
+        # 传递线程中抛出的异常
+        await task
+
+
+# 转换工作进程中与界面进程共享的进度队列和取消标记（由进程池的 initializer 设置）
+_job_progress_queue = None
+_job_cancel_upto = None
+
+
+def _init_conversion_process(progress_queue, cancel_upto, pdf_pool_workers, soffice_state):
+    """转换工作进程的初始化函数：保存与界面进程共享的进度队列、取消标记和soffice状态，并设置本进程PDF渲染进程池的大小"""
+    global _job_progress_queue, _job_cancel_upto, _pdf_pool_workers, _soffice_state, _soffice_process
+    _job_progress_queue = progress_queue
+    _job_cancel_upto = cancel_upto
+    _pdf_pool_workers = pdf_pool_workers
+    _soffice_state = soffice_state
+    # fork时继承来的 Popen 对象属于界面进程，本进程只负责结束自己启动的服务
+    _soffice_process = None
+    multiprocessing.util.Finalize(None, _terminate_own_soffice, exitpriority=10)
+
+
+def _job_cancelled(job_id: int) -> bool:
+    """界面进程是否已请求取消该任务（取消标记中保存的是已取消的最大任务编号）"""
+    return _job_cancel_upto is not None and _job_cancel_upto.value >= job_id
+
+
+def _run_conversion_job(job_id: int, input_file: str, output_file: str, file_type: str,
+                        settings: Optional[dict], report_progress: bool) -> Optional[str]:
+    """在常驻的工作进程中执行一次转换，返回输出文件路径，被取消时返回None
+    
+    settings 为界面进程中转换工作器的设置（硬件加速、编码取舍等），传入时覆盖工作进程中新建工作器的默认设置
+    进度以 (任务编号, 进度) 发送到共享队列；收到取消请求时只设置 worker.cancelled，
+    由转换代码协作式停止，FFmpeg子进程和PDF进程池任务都会在各自的 finally 中被正常结束
+    """
+    if _job_cancelled(job_id):
+        return None
+    
+    async def run() -> bool:
+        worker = ConversionWorker(input_file, output_file, file_type)
+        if settings:
+            worker.settings.update(settings)
+        
+        async def watch_cancel():
+            while not _job_cancelled(job_id):
+                await asyncio.sleep(JOB_POLL_INTERVAL)
+            worker.cancelled = True
+        
+        watcher = asyncio.ensure_future(watch_cancel())
+        try:
+            async for progress in worker.run_conversion():
+                if report_progress:
+                    _job_progress_queue.put((job_id, progress))
+        finally:
+            watcher.cancel()
+        return not worker.cancelled
+    
+    return output_file if asyncio.run(run()) else None
+
+
+class ConversionPool:
+    """常驻的转换进程池：工作进程在多次转换间复用（各类缓存、PDF进程池、soffice服务随之保留），
+    进度通过共享队列回传，取消通过共享的任务编号通知工作进程"""
+    
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._progress = multiprocessing.Queue()
+        self._cancel_upto = multiprocessing.Value('q', 0)
+        self._last_job_id = 0
+        # 各工作进程的PDF渲染进程池平分CPU：单个常驻工作进程可用全部CPU，批量转换时每个工作进程只用1~2个，
+        # 避免 工作进程数×CPU数 个渲染进程同时运行
+        self._pdf_pool_workers = max(1, (os.cpu_count() or 1) // max_workers)
+        self._executor = self._new_executor()
+    
+    def _new_executor(self) -> ProcessPoolExecutor:
+        """创建进程池（工作进程在首次提交任务时才会启动）"""
+        return ProcessPoolExecutor(max_workers=self.max_workers,
+                                   initializer=_init_conversion_process,
+                                   initargs=(self._progress, self._cancel_upto, self._pdf_pool_workers,
+                                             _get_soffice_state()))
+    
+    def submit(self, input_file: str, output_file: str, file_type: str,
+               settings: Optional[dict] = None, report_progress: bool = False):
+        """提交一次转换，返回 (任务编号, asyncio future)；工作进程意外退出导致进程池损坏时自动重建"""
+        self._last_job_id += 1
+        job_id = self._last_job_id
+        args = (_run_conversion_job, job_id, input_file, output_file, file_type, settings, report_progress)
+        try:
+            future = self._executor.submit(*args)
+        except BrokenProcessPool:
+            self._executor = self._new_executor()
+            future = self._executor.submit(*args)
+        return job_id, asyncio.wrap_future(future)
+    
+    def cancel_all(self):
+        """取消所有已提交的任务：尚未开始的直接丢弃，正在运行的由工作进程协作式停止"""
+        self._cancel_upto.value = self._last_job_id
+    
+    async def iter_progress(self, job_id: int, future: asyncio.Future):
+        """逐个产出指定任务的进度，任务结束后停止"""
+        while True:
+            try:
+                message_job, progress = await asyncio.to_thread(
+                    self._progress.get, True, JOB_POLL_INTERVAL)
+            except queue.Empty:
+                if future.done():
+                    return
+                continue
+            # 忽略已取消的旧任务残留的进度消息
+            if message_job == job_id:
+                yield progress
+
+
+def _batch_concurrency(max_workers: int) -> int:
+    """根据系统当前负载确定批量转换的并发数（无法获取负载时使用全部工作进程）"""
+    try:
+        load = os.getloadavg()[0]
+    except (AttributeError, OSError):
+        # Windows 没有 getloadavg
+        return max_workers
+    return max(1, min(max_workers, (os.cpu_count() or 1) - int(load)))
+
 
 class QconvertoNiceGUIApp:
     """Qconverto NiceGUI应用程序"""
     
+    # 上传组件接受的文件类型（供界面组件使用）
+    upload_accept = UPLOAD_ACCEPT
+    
     def __init__(self):
         self.input_file: Optional[str] = None
         self.output_dir: Optional[str] = None
@@ -1008,6 +2055,21 @@ class QconvertoNiceGUIApp:
         self.temp_files = []  # 跟踪临时文件以便清理
         self.conversion_task: Optional[asyncio.Task] = None
         self.conversion_in_progress = False
+        # 界面状态，转换箭头和动画的显示通过绑定跟随 phase 变化：'idle' / 'converting' / 'done'
+        self.state = {'phase': 'idle'}
+        # 最近一次选择的所有文件，多于一个时按批量转换处理
+        self.input_files = []
+        # 打开文件选择对话框后置位，该次选择的第一个文件上传时替换之前的选择
+        self._new_pick = False
+        # 文件类型识别的序号，每次上传递增，用于丢弃过期的识别结果
+        self._detect_token = 0
+        # 输出格式选择器当前显示的是哪种文件类型的选项
+        self._format_options_type: Optional[str] = None
+        # 批量转换使用的进程池（工作进程在首次提交任务时才会启动）
+        self.batch_max_workers = max(1, (os.cpu_count() or 2) - 1)
+        self.batch_pool = ConversionPool(max_workers=self.batch_max_workers)
+        # 单个文件转换使用的常驻工作进程，转换之间保留进程内的缓存和资源
+        self.conversion_pool = ConversionPool(max_workers=1)
         self.setup_ui()
         
     def setup_ui(self):
@@ -1030,19 +2092,39 @@ class QconvertoNiceGUIApp:
         # 日志功能已移除
         pass
     
-    def determine_file_type(self, file_path: str) -> Optional[str]:
-        """确定文件类型"""
-        if not os.path.exists(file_path):
-            return None
-            
+    def log_many(self, *lines: str):
+        """将连续的多条日志合并为一条记录输出，只触发一次日志处理"""
+        if lines:
+            logger.info('\n'.join(lines))
+    
+    def determine_file_type(self, file_path: str, stat: Optional[os.stat_result] = None) -> Optional[str]:
+        """确定文件类型：常见的无歧义扩展名直接采用，否则依据文件内容；
+        只有强签名（二进制文件头或容器结构）与扩展名不符时才按内容改判，其余情况依据扩展名
+        
+        调用方已获取文件状态时可通过 stat 传入，避免重复stat
+        """
         ext = os.path.splitext(file_path)[1].lower()
+        file_type = UNAMBIGUOUS_EXTS.get(ext)
+        if file_type:
+            return file_type
         
-        # 基于文件扩展名进行判断
-        for file_type, formats in SUPPORTED_FORMATS.items():
-            if ext in formats['输入']:
-                return file_type
-                
-        return None
+        if stat is None:
+            stat = _probe(file_path)
+        try:
+            detected = _sniff_file_type(file_path, stat.st_mtime_ns, stat.st_size) if stat else None
+        except OSError:
+            detected = None
+        
+        ext_type = EXT_TO_CATEGORY.get(ext)
+        if detected is None:
+            return ext_type
+        sniffed, strong = detected
+        # 内容与扩展名相符时仍以扩展名为准（如 .mp4 同时属于音频和视频）；
+        # 弱签名（如以 "MAC " 开头的 .txt 文本）不推翻扩展名，只在扩展名无法识别时采用
+        if ext in CATEGORY_INPUT_EXTS[sniffed] or (ext_type and not strong):
+            return ext_type
+        self.log(f"文件内容与扩展名 {ext} 不符，按{sniffed}文件处理")
+        return sniffed
     
     def get_file_icon(self, file_path: str) -> str:
         """根据文件扩展名获取相应的图标"""
@@ -1052,9 +2134,7 @@ class QconvertoNiceGUIApp:
     def update_converted_file_icon(self, output_format: str) -> None:
         """根据选择的输出格式更新转换后文件的图标"""
         if output_format:
-            # 将格式转换为扩展名（如 'pdf' → '.pdf'）
-            ext = f'.{output_format.lower()}'
-            icon_name = FILE_TYPE_ICONS.get(ext, 'insert_drive_file')
+            icon_name = FORMAT_TO_ICON.get(output_format, 'insert_drive_file')
             
             # 更新图标
             self.converted_file_icon.name = icon_name
@@ -1070,31 +2150,40 @@ class QconvertoNiceGUIApp:
     def update_format_options(self, file_type: str):
         """根据文件类型更新输出格式选项"""
         if file_type in SUPPORTED_FORMATS:
+            if file_type == self._format_options_type:
+                # 与当前选项属于同一类型时选项不变，保留用户已选择的输出格式
+                return
+            self._format_options_type = file_type
             formats = SUPPORTED_FORMATS[file_type]['输出']
-            self.format_select.options = formats
-            # 同时更新转换后文件区域的格式选择器
-            self.output_format_select.options = formats
-            if formats:
-                # 智能选择默认格式（优先选择高质量或常用格式）
-                default_format = self._get_recommended_format(file_type, formats)
-                self.format_select.value = default_format
-                self.output_format_select.value = default_format
+            # 智能选择默认格式（优先选择高质量或常用格式）
+            default_format = self._get_recommended_format(file_type, formats) if formats else None
+            self._set_select_options(self.format_select, formats, default_format)
+            if default_format:
                 # 更新转换后文件图标
                 self.update_converted_file_icon(default_format)
             
-
-            
             # 在日志中显示更详细的信息
-            self.log(f"✓ 检测到文件类型: {file_type}")
-            self.log(f"  可转换格式: {', '.join(formats)}")
+            self.log_many(f"✓ 检测到文件类型: {file_type}",
+                          f"  可转换格式: {OUTPUTS_JOINED[file_type]}")
             
             # 转换设置功能已移除
             pass
         else:
             # 不支持的文件类型
             self.log(f"✗ 不支持的文件类型: {file_type}")
-            self.format_select.options = []
-            self.output_format_select.options = []
+            self._format_options_type = None
+            self._set_select_options(self.format_select, [], None)
+    
+    @staticmethod
+    def _set_select_options(select, options: list, value: Optional[str]):
+        """一次性替换选择器的选项和当前值
+        
+        只赋值 options 不会同步到浏览器，值未变化时新选项也就不会显示；
+        显式调用 update()，NiceGUI 会把同一轮事件循环内对该元素的所有改动合并为一条消息发送
+        """
+        select.options = options
+        select.value = value
+        select.update()
     
     def _get_recommended_format(self, file_type: str, available_formats: list) -> str:
         """根据文件类型智能推荐最佳输出格式"""
@@ -1117,6 +2206,11 @@ class QconvertoNiceGUIApp:
         # 如果推荐格式都不在可用格式中，则返回第一个可用格式
         return available_formats[0] if available_formats else ''
     
+    def pick_files(self):
+        """打开文件选择对话框，本次选择的文件将替换之前的选择"""
+        self._new_pick = True
+        self.uploader.run_method('pickFiles')
+    
     async def handle_file_upload(self, e: events.UploadEventArguments):
         """处理文件上传"""
         # 保存上传的文件
@@ -1125,48 +2219,67 @@ class QconvertoNiceGUIApp:
         # 获取上传的文件
         if hasattr(e, 'files'):
             # 多文件上传
-            uploaded_file = next(iter(e.files), None)
+            uploaded_files = list(e.files)
         elif hasattr(e, 'file'):
             # 单文件上传
-            uploaded_file = e.file
+            uploaded_files = [e.file] if e.file else []
         else:
-            self.log("未收到上传文件")
-            return
+            uploaded_files = []
             
-        if not uploaded_file:
+        if not uploaded_files:
             self.log("未收到上传文件")
             return
-            
-        file_name = uploaded_file.name
-        self.log(f"接收到上传文件: {file_name}")
         
-        # 正确读取文件内容
-        file_content = await uploaded_file.read()
+        # 新一次选择的第一个文件到达时丢弃之前的选择，同一次多选的文件逐个到达时累积
+        if self._new_pick:
+            self._new_pick = False
+            self.input_files = []
         
         # 保存到临时文件
         temp_dir = os.path.join(os.getcwd(), 'temp')
         os.makedirs(temp_dir, exist_ok=True)
-        temp_file_path = os.path.join(temp_dir, file_name)
-        
-        with open(temp_file_path, 'wb') as f:
-            f.write(file_content)
-        
+        for uploaded_file in uploaded_files:
+            file_name = uploaded_file.name
+            self.log(f"接收到上传文件: {file_name}")
+            temp_file_path = os.path.join(temp_dir, file_name)
+            
+            if hasattr(uploaded_file, 'save'):
+                # 由NiceGUI流式写入目标文件（大文件本就缓存在磁盘上），无需把整个文件读入内存
+                await uploaded_file.save(temp_file_path)
+            else:
+                file_content = await uploaded_file.read()
+                await asyncio.to_thread(Path(temp_file_path).write_bytes, file_content)
+            
+            self.temp_files.append(temp_file_path)  # 添加到临时文件跟踪列表
+            if temp_file_path not in self.input_files:
+                self.input_files.append(temp_file_path)
         self.input_file = temp_file_path
-        self.temp_files.append(temp_file_path)  # 添加到临时文件跟踪列表
         
         # 更新新的UI组件
-        self.original_file_name.text = file_name
+        if len(self.input_files) > 1:
+            self.original_file_name.text = f"已选择 {len(self.input_files)} 个文件"
+        else:
+            self.original_file_name.text = file_name
         file_icon = self.get_file_icon(temp_file_path)
         self.original_file_icon.name = file_icon
         self.original_file_icon.classes(replace='text-6xl text-blue-500 mb-2 animate-bounce')
-        self.original_file_name.classes(replace='text-blue-600 text-center')
+        self.original_file_name.classes(replace='text-blue-600 text-center max-w-full truncate')
         
-        self.log(f"已选择输入文件: {file_name}")
-        self.log(f"文件保存路径: {temp_file_path}")
-        self.log(f"文件是否存在: {os.path.exists(temp_file_path)}")
+        self.log_many(f"已选择输入文件: {file_name}",
+                      f"文件保存路径: {temp_file_path}")
+        # stat和读取文件头在线程中进行，慢速磁盘或网络路径上也不会阻塞界面
+        self._detect_token += 1
+        token = self._detect_token
+        self.converted_file_name.text = '正在识别文件类型…'
+        input_stat = await asyncio.to_thread(_probe, temp_file_path)
+        self.log(f"文件是否存在: {input_stat is not None}")
+        file_type = await asyncio.to_thread(self.determine_file_type, temp_file_path, input_stat)
+        if token != self._detect_token:
+            # 识别期间又上传了新文件，以最新文件的识别结果为准
+            return
+        self.converted_file_name.text = '未转换'
         
         # 根据文件类型更新输出格式选项
-        file_type = self.determine_file_type(temp_file_path)
         if file_type:
             self.update_format_options(file_type)
         
@@ -1232,6 +2345,11 @@ class QconvertoNiceGUIApp:
     
     async def start_conversion(self):
         """开始转换"""
+        if len(self.input_files) > 1:
+            await self.start_batch(self.input_files)
+            return
+        self.input_files = []
+        
         self.log(f"开始转换调用，input_file值: {self.input_file}")
         if not self.input_file:
             ui.notify("请先选择输入文件", type='warning')
@@ -1239,38 +2357,38 @@ class QconvertoNiceGUIApp:
             return
             
         self.log(f"检查文件是否存在: {self.input_file}")
-        if not os.path.exists(self.input_file):
+        # 转换前重新获取一次文件状态（上传后文件可能已被清理），并复用于类型判断
+        input_stat = _probe(self.input_file)
+        if input_stat is None:
             ui.notify("输入文件不存在", type='negative')
-            self.log("警告: 输入文件不存在")
-            self.log(f"当前工作目录: {os.getcwd()}")
-            self.log(f"文件绝对路径: {os.path.abspath(self.input_file) if self.input_file else 'None'}")
+            self.log_many("警告: 输入文件不存在",
+                          f"当前工作目录: {os.getcwd()}",
+                          f"文件绝对路径: {os.path.abspath(self.input_file) if self.input_file else 'None'}")
             return
             
         # 确定输出文件路径
         input_dir = os.path.dirname(self.input_file)
         input_name = os.path.splitext(os.path.basename(self.input_file))[0]
-        # 优先使用转换后文件区域的格式选择，如果没有选择则使用顶部设置面板的格式选择
-        output_ext = self.output_format_select.value if self.output_format_select.value else self.format_select.value
+        output_ext = self.format_select.value
         output_dir = self.output_dir if self.output_dir else input_dir
         output_file = os.path.join(output_dir, f"{input_name}{output_ext}")
         
         # 确定文件类型
-        file_type = self.determine_file_type(self.input_file)
+        file_type = self.determine_file_type(self.input_file, input_stat)
         if not file_type:
             ui.notify("不支持的文件类型", type='negative')
             self.log("警告: 不支持的文件类型")
             return
             
-        self.log(f"开始转换 {self.input_file} 到 {output_file}")
-        self.log(f"文件类型: {file_type}")
+        self.log_many(f"开始转换 {self.input_file} 到 {output_file}",
+                      f"文件类型: {file_type}")
         
         # 禁用转换按钮，显示进度区域
         self.convert_button.disable()
         self.conversion_in_progress = True
         
-        # 启动转换动画
-        self.conversion_arrow.classes(replace='text-4xl text-blue-500 hidden')
-        self.conversion_spinner.classes(replace='block animate-spin')
+        # 启动转换动画（旋转和脉冲都由CSS关键帧驱动，转换过程中无需再切换样式）
+        self.state['phase'] = 'converting'
         
         try:
             # 创建转换工作器（不传递设置参数）
@@ -1289,33 +2407,30 @@ class QconvertoNiceGUIApp:
             self.convert_button.enable()
             self.conversion_in_progress = False
             # 停止转换动画
-            self.conversion_arrow.classes(replace='text-4xl text-blue-500')
-            self.conversion_spinner.classes(replace='hidden')
+            self.state['phase'] = 'idle'
     
     async def run_conversion_with_progress(self):
         """运行带进度更新的转换任务"""
         try:
-            async for progress in self.worker.run_conversion():
+            last_update = 0.0
+            async for progress in self.worker.run_in_process(self.conversion_pool):
                 if self.worker.cancelled:
                     break
+                # 限制刷新频率，避免每个百分点都通过websocket同步到浏览器
+                now = time.monotonic()
+                if progress < 100 and now - last_update < PROGRESS_UI_INTERVAL:
+                    continue
+                last_update = now
                 self.progress_bar.value = progress / 100
                 self.progress_text.text = f"转换进度: {progress}%"
-                
-                # 添加脉冲动画到转换箭头以反映进度
-                if progress % 10 == 0:  # 每10%触发一次动画
-                    self.conversion_spinner.classes(replace='block animate-pulse')
-                    # 短暂延迟后恢复旋转动画
-                    await asyncio.sleep(0.1)
-                    if not self.worker.cancelled:
-                        self.conversion_spinner.classes(replace='block animate-spin')
             
             if not self.worker.cancelled:
                 # 转换成功
-                self.log("✓ 转换成功完成!")
-                self.log(f"  输出文件: {self.worker.output_file}")
-                if os.path.exists(self.worker.output_file):
-                    size = os.path.getsize(self.worker.output_file)
-                    self.log(f"  文件大小: {self.format_file_size(size)}")
+                self.log_many("✓ 转换成功完成!",
+                              f"  输出文件: {self.worker.output_file}")
+                output_stat = _probe(self.worker.output_file)
+                if output_stat is not None:
+                    self.log(f"  文件大小: {self.format_file_size(output_stat.st_size)}")
                     
                     # 更新转换后文件显示
                     download_name = os.path.basename(self.worker.output_file)
@@ -1323,11 +2438,10 @@ class QconvertoNiceGUIApp:
                     file_icon = self.get_file_icon(self.worker.output_file)
                     self.converted_file_icon.name = file_icon
                     self.converted_file_icon.classes(replace='text-6xl text-green-500 mb-2 animate-pulse')
-                    self.converted_file_name.classes(replace='text-green-600 text-center')
+                    self.converted_file_name.classes(replace='text-green-600 text-center max-w-full truncate')
                     
-                    # 保存文件内容用于下载按钮
-                    with open(self.worker.output_file, 'rb') as f:
-                        self.converted_file_content = f.read()
+                    # 下载时直接由服务器从磁盘发送输出文件，无需读入内存
+                    output_path = Path(self.worker.output_file)
                     
                     # 在转换后文件区域添加下载按钮
                     # 清除之前的下载按钮（如果有的话）
@@ -1338,7 +2452,7 @@ class QconvertoNiceGUIApp:
                         ui.button(
                             '下载文件', 
                             icon='download',
-                            on_click=lambda: ui.download(self.converted_file_content, download_name)
+                            on_click=lambda: ui.download(output_path, download_name)
                         ).classes('px-4 py-2 bg-blue-500 text-white rounded-lg hover:bg-blue-600 transition-colors')
                     
                     self.log(f"  文件已准备好下载: {download_name}")
@@ -1349,8 +2463,7 @@ class QconvertoNiceGUIApp:
                     ui.notify("转换成功完成!", type='positive')
                 
                 # 停止转换动画并显示完成效果
-                self.conversion_spinner.classes(replace='hidden')
-                self.conversion_arrow.classes(replace='text-4xl text-green-500')
+                self.state['phase'] = 'done'
             else:
                 self.log("⚠ 转换已被取消")
                 self.progress_text.text = "转换已取消"
@@ -1359,9 +2472,14 @@ class QconvertoNiceGUIApp:
                     ui.notify("转换已被取消", type='warning')
                 
                 # 停止转换动画
-                self.conversion_spinner.classes(replace='hidden')
-                self.conversion_arrow.classes(replace='text-4xl text-blue-500')
-                
+                self.state['phase'] = 'idle'
+
+        except asyncio.CancelledError:
+            # 取消转换任务时等待中的 future 随之被取消，同样需要停止转换动画
+            self.log("⚠ 转换已被取消")
+            self.progress_text.text = "转换已取消"
+            self.state['phase'] = 'idle'
+            raise
         except Exception as e:
             self.log(f"✗ 转换错误: {str(e)}")
             self.progress_text.text = f"转换错误: {str(e)}"
@@ -1370,14 +2488,106 @@ class QconvertoNiceGUIApp:
                 ui.notify(f"转换错误: {str(e)}", type='negative')
             
             # 停止转换动画
-            self.conversion_spinner.classes(replace='hidden')
-            self.conversion_arrow.classes(replace='text-4xl text-blue-500')
+            self.state['phase'] = 'idle'
         finally:
             # 重新启用转换按钮
             self.convert_button.enable()
             self.conversion_in_progress = False
             self.conversion_task = None
     
+    async def start_batch(self, paths: list):
+        """批量转换：为每个文件确定输出路径后，分发到进程池并行转换"""
+        output_ext = self.format_select.value
+        if not output_ext:
+            ui.notify("请先选择输出格式", type='warning')
+            return
+        self.input_files = []
+        
+        # 与单个文件转换一样按文件内容识别类型，stat和读取文件头在线程中进行
+        file_types = await asyncio.gather(*(asyncio.to_thread(self.determine_file_type, path) for path in paths))
+        
+        jobs = []
+        results = []  # (输入文件, 是否成功, 输出文件或错误信息)
+        for path, file_type in zip(paths, file_types):
+            if not file_type:
+                results.append((path, False, "无法识别文件类型"))
+                continue
+            if output_ext not in SUPPORTED_FORMATS[file_type]['输出']:
+                results.append((path, False, f"{file_type}文件不支持转换为 {output_ext}"))
+                continue
+            input_name = os.path.splitext(os.path.basename(path))[0]
+            output_dir = self.output_dir if self.output_dir else os.path.dirname(path)
+            jobs.append((path, os.path.join(output_dir, f"{input_name}{output_ext}"), file_type))
+        
+        self.log(f"开始批量转换 {len(jobs)} 个文件到 {output_ext}")
+        
+        # 禁用转换按钮，显示进度区域
+        self.convert_button.disable()
+        self.conversion_in_progress = True
+        self.state['phase'] = 'converting'
+        
+        self.conversion_task = asyncio.create_task(self.run_batch_conversion(jobs, results))
+    
+    async def run_batch_conversion(self, jobs: list, results: list):
+        """运行批量转换并按完成的文件数更新进度，单个文件失败不影响其余文件"""
+        # 按系统负载限制同时进行的转换数量
+        limit = asyncio.Semaphore(_batch_concurrency(self.batch_max_workers))
+        
+        async def run_job(input_file, output_file, file_type):
+            async with limit:
+                try:
+                    _, future = self.batch_pool.submit(input_file, output_file, file_type)
+                    if await future is None:
+                        return input_file, False, "已取消"
+                    return input_file, True, output_file
+                except Exception as e:
+                    return input_file, False, str(e)
+        
+        tasks = [asyncio.ensure_future(run_job(*job)) for job in jobs]
+        try:
+            last_update = 0.0
+            for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+                results.append(await task)
+                # 大量小文件接连完成时合并刷新，界面最多每 PROGRESS_UI_INTERVAL 秒更新一次
+                now = time.monotonic()
+                if done < len(tasks) and now - last_update < PROGRESS_UI_INTERVAL:
+                    continue
+                last_update = now
+                self.progress_bar.value = done / len(tasks)
+                self.progress_text.text = f"批量转换: {done}/{len(tasks)}"
+            
+            succeeded = [output for _, ok, output in results if ok]
+            self.log_many(*(f"✗ {os.path.basename(input_file)} 转换失败: {error}"
+                            for input_file, ok, error in results if not ok))
+            
+            self.converted_file_name.text = f"已转换 {len(succeeded)}/{len(results)} 个文件"
+            self.download_button_container.clear()
+            with self.download_button_container:
+                for output_file in succeeded:
+                    ui.button(
+                        os.path.basename(output_file),
+                        icon='download',
+                        on_click=lambda output_file=output_file: ui.download(Path(output_file))
+                    ).classes('px-4 py-2 bg-blue-500 text-white rounded-lg hover:bg-blue-600 transition-colors')
+            
+            self.progress_text.text = f"批量转换完成: 成功 {len(succeeded)} 个，失败 {len(results) - len(succeeded)} 个"
+            with self.main_container:
+                ui.notify(self.progress_text.text, type='positive' if len(succeeded) == len(results) else 'warning')
+            self.state['phase'] = 'done'
+        except asyncio.CancelledError:
+            self.log("⚠ 批量转换已被取消")
+            self.progress_text.text = "转换已取消"
+            self.state['phase'] = 'idle'
+        finally:
+            # 取消尚未开始的任务，并通知工作进程停止正在进行的转换（FFmpeg等子进程随之结束）
+            if not all(task.done() for task in tasks):
+                self.batch_pool.cancel_all()
+            for task in tasks:
+                task.cancel()
+            self.convert_button.enable()
+            self.conversion_in_progress = False
+            self.conversion_task = None
+    
     def cancel_conversion(self):
         """取消转换"""
         if self.worker:
@@ -1405,8 +2615,8 @@ class QconvertoNiceGUIApp:
         # 重置UI元素
         self.selected_file_label.text = '未选择文件'
         self.selected_file_label.classes(replace='text-gray-500')
-        self.format_select.options = []
-        self.format_select.value = None
+        self._format_options_type = None
+        self._set_select_options(self.format_select, [], None)
         self.progress_bar.value = 0
         self.progress_text.text = '准备就绪'
         self.log_output.value = ''
@@ -1421,37 +2631,45 @@ class QconvertoNiceGUIApp:
         """清理临时文件"""
         for temp_file in self.temp_files:
             try:
-                if os.path.exists(temp_file):
-                    os.remove(temp_file)
+                os.remove(temp_file)
+            except FileNotFoundError:
+                # 文件已被删除，无需处理
+                pass
             except Exception as e:
                 self.log(f"清理临时文件失败 {temp_file}: {e}")
         self.temp_files = []
+        self.input_files = []
     
     def format_file_size(self, size_bytes: int) -> str:
         """格式化文件大小"""
-        if size_bytes == 0:
+        if size_bytes <= 0:
             return "0 B"
         size_names = ["B", "KB", "MB", "GB"]
-        i = 0
-        while size_bytes >= 1024 and i < len(size_names) - 1:
-            size_bytes /= 1024.0
-            i += 1
-        return f"{size_bytes:.1f} {size_names[i]}"
-
+        # 每个单位相差1024倍，即10个二进制位，直接由位长度算出单位
+        i = min(len(size_names) - 1, (size_bytes.bit_length() - 1) // 10)
+        return f"{size_bytes / (1 << (10 * i)):.1f} {size_names[i]}"
 
-# 创建应用实例
-app_instance = QconvertoNiceGUIApp()
-
-# 注册应用关闭时的清理函数
-import atexit
-atexit.register(app_instance.cleanup_temp_files)
 
 # 运行应用
+# 界面只在主进程中创建：spawn/forkserver 方式启动的工作进程会重新导入本模块（__name__ 为 '__mp_main__'），不应再创建一份应用
 if __name__ == '__main__':
+    import atexit
+    
+    # 创建应用实例
+    app_instance = QconvertoNiceGUIApp()
+    
+    # 注册应用关闭时的清理函数
+    atexit.register(app_instance.cleanup_temp_files)
+    atexit.register(_shutdown_soffice_server)
+    
     # 获取Railway提供的端口，如果不存在则使用默认端口
-    import os
     port = int(os.environ.get('PORT', 8081))
     
+    # 提前启动常驻的LibreOffice服务，首个DOC转换无需等待办公套件冷启动
+    # （放在这里而不是应用初始化中，避免进程池的工作进程导入本模块时也启动一份）
+    if _soffice_server_available():
+        threading.Thread(target=_prewarm_soffice_server, daemon=True).start()
+    
     ui.run(
         title='Qconverto - 多媒体文件格式转换工具',
         reload=False,
@@ -11,6 +11,11 @@ from pathlib import Path
 from nicegui import ui, events
 from typing import Optional, Callable
 
+# 原始文件区域在空闲、拖拽悬停和放下文件时的样式
+DROP_AREA_CLASSES_IDLE = 'flex-1 min-w-0 items-center p-6 border-2 border-dashed border-gray-300 rounded-lg min-h-64 cursor-pointer transition-all duration-300 file-area-hover'
+DROP_AREA_CLASSES_HOVER = 'flex-1 min-w-0 items-center p-6 border-2 border-dashed border-blue-500 rounded-lg min-h-64 cursor-pointer transition-all duration-300 bg-blue-50 file-area-hover'
+DROP_AREA_CLASSES_DROP = 'flex-1 min-w-0 items-center p-6 border-2 border-dashed border-green-500 rounded-lg min-h-64 cursor-pointer transition-all duration-300 bg-green-50 file-area-hover'
+
 
 class ModernUIComponents:
     """现代化UI组件类"""
@@ -48,37 +53,54 @@ class ModernUIComponents:
             # 新的三段式布局容器
             with ui.row().classes('w-full justify-between items-center gap-8') as conversion_layout:
                 # 左侧：原始文件显示区域（整合拖拽功能）
-                with ui.column().classes('flex-1 items-center p-6 border-2 border-dashed border-gray-300 rounded-lg min-h-64 cursor-pointer transition-all duration-300 file-area-hover') as left_area:
+                with ui.column().classes(DROP_AREA_CLASSES_IDLE) as left_area:
                     ui.label('原始文件').classes('font-medium mb-4')
                     self.app.original_file_icon = ui.icon('insert_drive_file').classes('text-6xl text-gray-400 mb-2')
-                    self.app.original_file_name = ui.label('未选择文件').classes('text-gray-500 text-center')
+                    self.app.original_file_name = ui.label('未选择文件').classes('text-gray-500 text-center max-w-full truncate')
                     
                     # 添加选择文件按钮到原始文件区域内
                     ui.button(
                         '选择文件', 
                         icon='folder_open',
-                        on_click=lambda: self.app.uploader.run_method('pickFiles')
+                        on_click=self.app.pick_files
                     ).classes('px-6 py-3 bg-blue-500 text-white rounded-lg hover:bg-blue-600 transition-colors mt-4')
                     
                     # 添加拖拽上传组件到原始文件区域
                     self.app.uploader = ui.upload(
-                        multiple=False,
+                        multiple=True,
                         auto_upload=True,
                         on_upload=self.app.handle_file_upload
-                    ).props('accept=*/*').classes('hidden')
+                    ).props(f'accept="{self.app.upload_accept}"').classes('hidden')
                     
                     # 添加拖拽事件处理
-                    left_area.on('dragover.prevent', lambda e: left_area.classes(replace='flex-1 items-center p-6 border-2 border-dashed border-blue-500 rounded-lg min-h-64 cursor-pointer transition-all duration-300 bg-blue-50 file-area-hover'))
-                    left_area.on('dragleave.prevent', lambda e: left_area.classes(replace='flex-1 items-center p-6 border-2 border-dashed border-gray-300 rounded-lg min-h-64 cursor-pointer transition-all duration-300 file-area-hover'))
-                    left_area.on('drop.prevent', lambda e: (
-                        self.app.uploader.run_method('pickFiles'),
-                        left_area.classes(replace='flex-1 items-center p-6 border-2 border-dashed border-green-500 rounded-lg min-h-64 cursor-pointer transition-all duration-300 bg-green-50 file-area-hover')
-                    ))
+                    # dragover 在拖动过程中每秒触发数十次，只在悬停状态改变时才向浏览器下发样式，并节流事件回传
+                    is_hovering = [False]
+                    
+                    def on_dragover(e):
+                        if is_hovering[0]:
+                            return
+                        is_hovering[0] = True
+                        left_area.classes(replace=DROP_AREA_CLASSES_HOVER)
+                    
+                    def on_dragleave(e):
+                        is_hovering[0] = False
+                        left_area.classes(replace=DROP_AREA_CLASSES_IDLE)
+                    
+                    def on_drop(e):
+                        is_hovering[0] = False
+                        self.app.pick_files()
+                        left_area.classes(replace=DROP_AREA_CLASSES_DROP)
+                    
+                    left_area.on('dragover.prevent', on_dragover, throttle=0.2)
+                    left_area.on('dragleave.prevent', on_dragleave)
+                    left_area.on('drop.prevent', on_drop)
                 
                 # 中间：转换箭头动画区域
                 with ui.column().classes('items-center justify-center') as center_area:
-                    self.app.conversion_arrow = ui.icon('arrow_forward').classes('text-4xl text-blue-500')
-                    self.app.conversion_spinner = ui.spinner(size='lg', thickness=5).classes('hidden')
+                    # 箭头、完成箭头和转换动画按转换阶段切换显示，无需在转换过程中替换样式
+                    self.app.conversion_arrow = ui.icon('arrow_forward').classes('text-4xl text-blue-500').bind_visibility_from(self.app.state, 'phase', backward=lambda phase: phase == 'idle')
+                    self.app.conversion_done_arrow = ui.icon('arrow_forward').classes('text-4xl text-green-500').bind_visibility_from(self.app.state, 'phase', backward=lambda phase: phase == 'done')
+                    self.app.conversion_spinner = ui.spinner(size='lg', thickness=5).classes('animate-conv-pulse').bind_visibility_from(self.app.state, 'phase', backward=lambda phase: phase == 'converting')
                     
                     # 将开始转换按钮移到箭头下方
                     self.app.convert_button = ui.button(
@@ -88,19 +110,16 @@ class ModernUIComponents:
                     ).classes('px-6 py-3 bg-green-500 text-white rounded-lg hover:bg-green-600 transition-colors mt-4').bind_visibility_from(self.app, 'input_file')
                 
                 # 右侧：转换后文件显示区域（添加格式选择功能）
-                with ui.column().classes('flex-1 items-center p-6 border-2 border-dashed border-gray-300 rounded-lg min-h-64') as right_area:
+                with ui.column().classes('flex-1 min-w-0 items-center p-6 border-2 border-dashed border-gray-300 rounded-lg min-h-64') as right_area:
                     ui.label('转换后文件').classes('font-medium mb-4')
                     self.app.converted_file_icon = ui.icon('insert_drive_file').classes('text-6xl text-gray-400 mb-2')
-                    self.app.converted_file_name = ui.label('未转换').classes('text-gray-500 text-center')
+                    self.app.converted_file_name = ui.label('未转换').classes('text-gray-500 text-center max-w-full truncate')
                     
                     # 添加输出格式选择器
                     with ui.row().classes('w-full items-center mt-4'):
                         ui.label('输出格式:').classes('text-sm')
                         self.app.format_select = ui.select([], value=None).classes('flex-grow')
                     
-                    # 添加输出格式选择器（用于向后兼容）
-                    self.app.output_format_select = ui.select([], value=None).classes('hidden')
-                    
                     # 添加下载按钮占位符
                     with ui.column().classes('items-center mt-4') as download_area:
                         self.app.download_button_container = ui.column().classes('w-full items-center')